@@ -0,0 +1,5 @@
+# Copyright (c) 2026 Varun Sharma
+#
+# SPDX-License-Identifier: MIT
+
+"""Benchmarks for sphinx-datatables."""
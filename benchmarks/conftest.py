@@ -0,0 +1,132 @@
+# Copyright (c) 2026 Varun Sharma
+#
+# SPDX-License-Identifier: MIT
+
+"""Synthetic sites and build measurements for the sphinx-datatables benchmarks."""
+
+import shutil
+import textwrap
+import tracemalloc
+from dataclasses import dataclass
+from io import StringIO
+from pathlib import Path
+
+from sphinx.application import Sphinx
+
+__all__ = ["SiteShape", "build_site", "generate_site", "output_sizes", "peak_memory"]
+
+NL = "\n"
+
+
+@dataclass(frozen=True)
+class SiteShape:
+    """The size of a synthetic site."""
+
+    pages: int
+    tables: int
+    rows: int
+    directives: int = 0
+    conf: str = ""
+
+    def __str__(self) -> str:
+        """Name the shape, for the benchmark IDs."""
+        return f"{self.pages}p-{self.tables}t-{self.rows}r-{self.directives}d"
+
+
+def generate_table(name: str, rows: int) -> str:
+    """Write a ``list-table`` with a header row, and a mix of column types."""
+    body = "".join(
+        f"{NL}    * - item {row}{NL}      - {row * 7 % 1000}{NL}"
+        f"      - 2024-01-{row % 28 + 1:02d}{NL}      - **{row % 3}**"
+        for row in range(rows)
+    )
+    return (
+        textwrap.dedent(f"""
+        .. list-table:: {name}
+            :header-rows: 1
+            :class: sphinx-datatable {name}
+
+            * - Name
+              - Count
+              - Date
+              - Group""")
+        + body
+    )
+
+
+def generate_site(root: Path, shape: SiteShape) -> Path:
+    """Generate a Sphinx project of a given shape, returning its source directory."""
+    src = root / "src"
+    shutil.rmtree(src, ignore_errors=True)
+    src.mkdir(parents=True)
+    (src / "conf.py").write_text(
+        textwrap.dedent("""
+            extensions = ["sphinxcontrib.jquery", "sphinx_datatables"]
+        """)
+        + shape.conf,
+        encoding="utf-8",
+    )
+    toctree = "".join(f"{NL}    page{page}" for page in range(shape.pages))
+    (src / "index.rst").write_text(
+        f"index{NL}====={NL}{NL}.. toctree::{NL}{toctree}{NL}", encoding="utf-8"
+    )
+    for page in range(shape.pages):
+        tables = [
+            generate_table(f"table-{table}", shape.rows)
+            for table in range(shape.tables)
+        ]
+        directives = [
+            f".. datatables-json:: table.table-{directive}{NL}{NL}"
+            f'    {{"pageLength": {10 + directive % 2 * 15}}}'
+            for directive in range(shape.directives)
+        ]
+        (src / f"page{page}.rst").write_text(
+            f"page {page}{NL}=========={NL}{NL}" + (NL * 2).join(tables + directives),
+            encoding="utf-8",
+        )
+    return src
+
+
+def build_site(src: Path, out: Path, *, fresh: bool) -> None:
+    """Build a site to HTML, from scratch or incrementally."""
+    if fresh:
+        shutil.rmtree(out, ignore_errors=True)
+    app = Sphinx(
+        srcdir=src,
+        confdir=src,
+        outdir=out / "html",
+        doctreedir=out / "doctrees",
+        buildername="html",
+        status=None,
+        warning=StringIO(),
+        freshenv=fresh,
+    )
+    app.build()
+    if app.statuscode:  # pragma: no cover
+        msg = f"Build failed with status {app.statuscode}"
+        raise RuntimeError(msg)
+
+
+def peak_memory(src: Path, out: Path, *, fresh: bool) -> int:
+    """Measure the peak memory allocated by Python during a build, in bytes."""
+    tracemalloc.start()
+    try:
+        build_site(src, out, fresh=fresh)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def output_sizes(out: Path) -> dict[str, int]:
+    """Measure the size of the pages, scripts and data written by a build."""
+    html = out / "html"
+    static = html / "_static"
+    return {
+        "html_bytes": sum(path.stat().st_size for path in html.glob("*.html")),
+        "js_bytes": sum(path.stat().st_size for path in static.glob("*datatables*.js")),
+        "data_bytes": sum(
+            path.stat().st_size
+            for path in (static / "datatables-data").rglob("*")
+            if path.is_file()
+        ),
+    }
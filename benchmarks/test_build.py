@@ -0,0 +1,103 @@
+# Copyright (c) 2026 Varun Sharma
+#
+# SPDX-License-Identifier: MIT
+
+"""
+Build time and page weight benchmarks for sphinx-datatables.
+
+These use ``pytest-benchmark``, and are run separately from the tests::
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+
+The peak memory and output sizes of each build are saved with the timings, in
+``extra_info``.
+"""
+
+import dataclasses
+from pathlib import Path
+
+import pytest
+
+from .conftest import SiteShape, build_site, generate_site, output_sizes, peak_memory
+
+BenchmarkFixture = pytest.importorskip("pytest_benchmark.fixture").BenchmarkFixture
+
+ROUNDS = 3
+
+SHAPES = [
+    SiteShape(pages=20, tables=2, rows=20),
+    SiteShape(pages=20, tables=5, rows=50, directives=2),
+    SiteShape(pages=5, tables=1, rows=1000),
+    SiteShape(
+        pages=5,
+        tables=1,
+        rows=1000,
+        conf="datatables_external_data_threshold = 200",
+    ),
+    SiteShape(
+        pages=20,
+        tables=5,
+        rows=50,
+        directives=2,
+        conf="datatables_column_types = True\ndatatables_sort_keys = {'Date': 'date'}",
+    ),
+]
+
+
+@pytest.fixture(params=SHAPES, ids=str)
+def site(request: pytest.FixtureRequest, tmp_path: Path) -> tuple[Path, SiteShape]:
+    """Generate a synthetic site."""
+    shape: SiteShape = request.param
+    return generate_site(tmp_path, shape), shape
+
+
+def test_full_build(
+    benchmark: BenchmarkFixture, site: tuple[Path, SiteShape], tmp_path: Path
+) -> None:
+    """Benchmark a full HTML build from scratch."""
+    src, shape = site
+    out = tmp_path / "build"
+
+    benchmark.pedantic(
+        build_site, args=(src, out), kwargs={"fresh": True}, rounds=ROUNDS
+    )
+
+    benchmark.extra_info.update(
+        shape=dataclasses.asdict(shape),
+        peak_memory=peak_memory(src, out, fresh=True),
+        **output_sizes(out),
+    )
+
+
+def test_incremental_build(
+    benchmark: BenchmarkFixture,
+    site: tuple[Path, SiteShape],
+    tmp_path: Path,
+) -> None:
+    """Benchmark an incremental HTML build, after changing a single page."""
+    src, shape = site
+    out = tmp_path / "build"
+    build_site(src, out, fresh=True)
+    page = src / "page0.rst"
+    content = page.read_text(encoding="utf-8")
+
+    def change_page() -> None:
+        nonlocal content
+        content += "\n\nChanged."
+        page.write_text(content, encoding="utf-8")
+
+    benchmark.pedantic(
+        build_site,
+        args=(src, out),
+        kwargs={"fresh": False},
+        setup=change_page,
+        rounds=ROUNDS,
+    )
+
+    change_page()
+    benchmark.extra_info.update(
+        shape=dataclasses.asdict(shape),
+        peak_memory=peak_memory(src, out, fresh=False),
+        **output_sizes(out),
+    )
@@ -0,0 +1,133 @@
+# Copyright (c) 2026 Varun Sharma
+#
+# SPDX-License-Identifier: MIT
+
+"""Static asset utilities."""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import shutil
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from sphinx.errors import ExtensionError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+HAS_BROTLI = importlib.util.find_spec("brotli") is not None
+
+#: The number of hex digits of the content hash used in file names
+HASH_LENGTH = 8
+
+#: The suffix of the precompressed sibling of a file, for each encoding
+COMPRESSED_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+def content_hash(content: bytes) -> str:
+    """Get a short, stable hash of some content for use in file names."""
+    return hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_filename(name: str, content: bytes) -> str:
+    """
+    Insert the content hash into a file name, after the stem.
+
+    For example, ``datatables.min.js`` becomes ``datatables.3f9a1c2b.min.js``.
+    """
+    stem, dot, suffixes = name.partition(".")
+    return f"{stem}.{content_hash(content)}{dot}{suffixes}"
+
+
+def write_static_file(static_dir: Path, filename: str, content: bytes) -> bool:
+    """
+    Write a file into the static directory, only if its content changed.
+
+    Returns whether the file was written.
+    """
+    target = static_dir / filename
+    if target.is_file() and target.read_bytes() == content:
+        return False
+    static_dir.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(content)
+    return True
+
+
+@dataclass(frozen=True)
+class VendoredAsset:
+    """A local file copied into ``_static`` under a content-hashed name."""
+
+    source: Path
+    filename: str
+
+    @classmethod
+    def from_directory(cls, directory: Path, name: str) -> VendoredAsset:
+        """Find a vendored file, failing the build if it is missing."""
+        source = directory / name
+        if not source.is_file():
+            msg = f"datatables_vendor_dir is missing the file {name!r}: {source}"
+            raise ExtensionError(msg)
+        return cls(source=source, filename=hashed_filename(name, source.read_bytes()))
+
+    def copy_to(self, static_dir: Path) -> None:
+        """Copy the file, unless it was already copied by an earlier build."""
+        target = static_dir / self.filename
+        if not target.exists():
+            static_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(self.source, target)
+
+
+def _compress(content: bytes, encoding: str) -> bytes:
+    """Compress some content as small as possible, reproducibly."""
+    if encoding == "br":  # pragma: no cover
+        import brotli  # noqa: PLC0415
+
+        return brotli.compress(content, quality=11)
+
+    import gzip  # noqa: PLC0415
+
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def write_compressed_siblings(path: Path, encodings: Iterable[str]) -> int:
+    """
+    Write a compressed sibling of a file for each encoding, such as ``x.json.gz``.
+
+    As every file the extension writes is named by a hash of its content, an
+    existing sibling is up-to-date, unless it is older than the file. A sibling
+    which would not be smaller than the file is not written. Returns the number
+    of siblings written.
+    """
+    mtime_ns = path.stat().st_mtime_ns
+    content = None
+    written = 0
+    for encoding in encodings:
+        sibling = path.with_name(f"{path.name}{COMPRESSED_SUFFIXES[encoding]}")
+        if sibling.is_file() and sibling.stat().st_mtime_ns >= mtime_ns:
+            continue
+        if content is None:
+            content = path.read_bytes()
+        compressed = _compress(content, encoding)
+        if len(compressed) < len(content):
+            sibling.write_bytes(compressed)
+            written += 1
+    return written
+
+
+def precompress(paths: Iterable[Path], encodings: Iterable[str]) -> int:
+    """
+    Write the compressed siblings of many files, in a thread pool.
+
+    Both ``zlib`` and ``brotli`` release the GIL while compressing, so the files
+    are compressed in parallel. Returns the number of siblings written.
+    """
+    import concurrent.futures  # noqa: PLC0415
+
+    encodings = tuple(encodings)
+    with concurrent.futures.ThreadPoolExecutor() as pool:
+        return sum(
+            pool.map(lambda path: write_compressed_siblings(path, encodings), paths)
+        )
@@ -6,14 +6,32 @@
 
 from __future__ import annotations
 
+import html
+import os
+import urllib.parse
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from sphinx.errors import ExtensionError
+
+from .assets import COMPRESSED_SUFFIXES, HAS_BROTLI, VendoredAsset, hashed_filename
+from .js import create_datatables_js, create_presets_js, create_search_worker_js
+from .keys import get_key_function
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    import packaging.version
     from sphinx.config import Config as SphinxConfig
 
+DATATABLES_CDN = "https://cdn.datatables.net"
+
+#: When tables are initialized: on page load, when idle, or as they become visible
+LAZY_MODES = ("off", "idle", "visible")
 
-@dataclass
+
+@dataclass(frozen=True)
 class SphinxDatatablesConfig:
     """Holds the configuration data for the extension."""
 
@@ -22,14 +40,240 @@ class SphinxDatatablesConfig:
     datatables_options: dict | str = field(default_factory=dict)
     datatables_js: str = ""
     datatables_css: str = ""
+    datatables_all_pages: bool = False
+    datatables_vendor_dir: str = ""
+    datatables_external_data_threshold: int = 0
+    datatables_shard_size: int = 0
+    datatables_column_types: bool = False
+    datatables_sort_keys: dict = field(default_factory=dict)
+    datatables_search_keys: dict = field(default_factory=dict)
+    datatables_presets: dict = field(default_factory=dict)
+    datatables_report: bool = False
+    datatables_lazy: str = "off"
+    datatables_min_rows: int = 0
+    datatables_large_cells: int = 0
+    datatables_large_options: dict = field(default_factory=dict)
+    datatables_defer: bool = False
+    datatables_preload: bool = False
+    datatables_inline_css: bool = False
+    datatables_minify: bool = False
+    datatables_precompress: list[str] = field(default_factory=list)
+    datatables_cache_data: bool = False
 
     @classmethod
     def from_sphinx_config(cls, sphinx_config: SphinxConfig) -> SphinxDatatablesConfig:
         """Create SphinxDatatablesConfig from Sphinx-loaded configuration."""
-        return cls(
+        config = cls(
             datatables_version=sphinx_config.datatables_version,
             datatables_class=sphinx_config.datatables_class,
             datatables_options=sphinx_config.datatables_options,
             datatables_js=sphinx_config.datatables_js,
             datatables_css=sphinx_config.datatables_css,
+            datatables_all_pages=sphinx_config.datatables_all_pages,
+            datatables_vendor_dir=os.fspath(sphinx_config.datatables_vendor_dir),
+            datatables_external_data_threshold=(
+                sphinx_config.datatables_external_data_threshold
+            ),
+            datatables_shard_size=sphinx_config.datatables_shard_size,
+            datatables_column_types=sphinx_config.datatables_column_types,
+            datatables_sort_keys=sphinx_config.datatables_sort_keys,
+            datatables_search_keys=sphinx_config.datatables_search_keys,
+            datatables_presets=sphinx_config.datatables_presets,
+            datatables_report=sphinx_config.datatables_report,
+            datatables_lazy=sphinx_config.datatables_lazy,
+            datatables_min_rows=sphinx_config.datatables_min_rows,
+            datatables_large_cells=sphinx_config.datatables_large_cells,
+            datatables_large_options=sphinx_config.datatables_large_options,
+            datatables_defer=sphinx_config.datatables_defer,
+            datatables_preload=sphinx_config.datatables_preload,
+            datatables_inline_css=sphinx_config.datatables_inline_css,
+            datatables_minify=sphinx_config.datatables_minify,
+            datatables_precompress=list(sphinx_config.datatables_precompress),
+            datatables_cache_data=sphinx_config.datatables_cache_data,
+        )
+        config.validate()
+        return config
+
+    def __getstate__(self) -> dict[str, Any]:
+        """
+        Get the state to pickle with the environment, without key functions.
+
+        Like Sphinx's own configuration, callables from ``conf.py`` cannot be
+        pickled. They are only used while writing, in the main process, and are
+        resolved again from ``conf.py`` whenever the builder starts.
+        """
+        state = dict(self.__dict__)
+        for name in ("datatables_sort_keys", "datatables_search_keys"):
+            state[name] = {
+                column: key for column, key in state[name].items() if not callable(key)
+            }
+        return state
+
+    @property
+    def parsed_version(self) -> packaging.version.Version:
+        """The ``datatables_version`` as a comparable version."""
+        import packaging.version  # noqa: PLC0415
+
+        return packaging.version.parse(self.datatables_version)
+
+    @property
+    def native_api(self) -> bool:
+        """
+        Whether to initialize tables with the DataTables API, instead of jQuery's.
+
+        DataTables 2 has its own API, such as ``new DataTable(...)``.
+        """
+        import packaging.version  # noqa: PLC0415
+
+        return self.parsed_version >= packaging.version.Version("2")
+
+    def validate(self) -> None:
+        """Check the configuration, raising an ``ExtensionError`` if invalid."""
+        import packaging.version  # noqa: PLC0415
+
+        try:
+            self.parsed_version  # noqa: B018
+        except packaging.version.InvalidVersion:
+            msg = f"Invalid datatables_version: {self.datatables_version!r}"
+            raise ExtensionError(msg) from None
+        for keys in (self.datatables_sort_keys, self.datatables_search_keys):
+            for key in keys.values():
+                get_key_function(key)
+        if self.datatables_lazy not in LAZY_MODES:
+            modes = ", ".join(LAZY_MODES)
+            msg = f"Invalid datatables_lazy: {self.datatables_lazy!r}, expected {modes}"
+            raise ExtensionError(msg)
+        for encoding in self.datatables_precompress:
+            if encoding not in COMPRESSED_SUFFIXES:
+                expected = ", ".join(COMPRESSED_SUFFIXES)
+                msg = (
+                    f"Invalid datatables_precompress: {encoding!r}, expected {expected}"
+                )
+                raise ExtensionError(msg)
+            if encoding == "br" and not HAS_BROTLI:  # pragma: no cover
+                msg = "datatables_precompress 'br' requires the brotli library"
+                raise ExtensionError(msg)
+        for name, options in self.datatables_presets.items():
+            if not isinstance(options, (dict, str)):
+                msg = f"Invalid datatables_presets {name!r}: expected a dict or str"
+                raise ExtensionError(msg)
+
+
+@dataclass(frozen=True)
+class SphinxDatatablesAssets:
+    """The assets added to pages, resolved once per build."""
+
+    datatables_js: str
+    datatables_css: str
+    activate_js: str
+    vendored: tuple[VendoredAsset, ...] = ()
+    presets_js: str = ""
+    inline_css: str = ""
+    search_worker_js: str = ""
+
+    @classmethod
+    def from_config(
+        cls, config: SphinxDatatablesConfig, confdir: Path | None = None
+    ) -> SphinxDatatablesAssets:
+        """
+        Choose the asset URLs for the configured DataTables version.
+
+        If ``datatables_vendor_dir`` is set, local copies are used instead of the
+        CDN, resolved relative to ``confdir``.
+        """
+        version = config.datatables_version
+        import packaging.version  # noqa: PLC0415
+
+        if config.parsed_version < packaging.version.parse("2.0.0"):
+            cdn = f"{DATATABLES_CDN}/{version}"
+            js_name = "jquery.dataTables.min.js"
+            css_name = "jquery.dataTables.min.css"
+            datatables_js = f"{cdn}/js/{js_name}"
+            datatables_css = f"{cdn}/css/{css_name}"
+        else:
+            # for DataTables 2.0.0 and above, only the minified version is available
+            # and jQuery is not included
+            cdn = f"{DATATABLES_CDN}/v/dt/dt-{version}"
+            js_name = "datatables.min.js"
+            css_name = "datatables.min.css"
+            datatables_js = f"{cdn}/{js_name}"
+            datatables_css = f"{cdn}/{css_name}"
+
+        vendored: list[VendoredAsset] = []
+        if config.datatables_vendor_dir:
+            vendor_dir = Path(confdir or ".") / config.datatables_vendor_dir
+            if not config.datatables_js:
+                vendored.append(VendoredAsset.from_directory(vendor_dir, js_name))
+                datatables_js = vendored[-1].filename
+            if not config.datatables_css:
+                vendored.append(VendoredAsset.from_directory(vendor_dir, css_name))
+                datatables_css = vendored[-1].filename
+
+        inline_css = ""
+        if config.datatables_inline_css:
+            css = next((v for v in vendored if v.filename == datatables_css), None)
+            if css is None:
+                msg = (
+                    "datatables_inline_css requires the DataTables CSS to be"
+                    " vendored with datatables_vendor_dir"
+                )
+                raise ExtensionError(msg)
+            inline_css = css.source.read_text(encoding="utf-8")
+
+        return cls(
+            datatables_js=config.datatables_js or datatables_js,
+            datatables_css=config.datatables_css or datatables_css,
+            activate_js=hashed_filename(
+                "activate_datatables.js",
+                create_datatables_js(config).encode("utf-8"),
+            ),
+            vendored=tuple(vendored),
+            presets_js=hashed_filename(
+                "presets_datatables.js",
+                create_presets_js(config).encode("utf-8"),
+            )
+            if config.datatables_presets
+            else "",
+            inline_css=inline_css,
+            search_worker_js=hashed_filename(
+                "search_worker.js",
+                create_search_worker_js(config).encode("utf-8"),
+            ),
+        )
+
+    def resource_hints(
+        self, static_url: Callable[[str], str | None], *, preload: bool
+    ) -> str:
+        """
+        Get the tags to add to the ``<head>`` of a page, to fetch the assets early.
+
+        A connection to the CDN is opened while the page is still being parsed,
+        and the DataTables bundle is optionally preloaded. ``static_url`` gets the
+        URL of a file in ``_static`` exactly as the page's tags load it, or
+        ``None`` if it is not known, in which case it is not preloaded. The CSS is
+        included in the page itself if it is inlined.
+        """
+        urls = (self.datatables_js, self.datatables_css)
+        origins = dict.fromkeys(
+            "{0.scheme}://{0.netloc}".format(urllib.parse.urlsplit(url))
+            for url in urls
+            if "://" in url
         )
+        hints = [
+            f'<link rel="{rel}" href="{html.escape(origin)}">'
+            for origin in origins
+            for rel in ("preconnect", "dns-prefetch")
+        ]
+        if preload:
+            for url, kind in zip(urls, ("script", "style"), strict=True):
+                href = url if "://" in url else static_url(url)
+                if href is None or (kind == "style" and self.inline_css):
+                    continue
+                hints.append(
+                    f'<link rel="preload" href="{html.escape(href)}" as="{kind}">'
+                )
+        if self.inline_css:
+            hints.append(
+                f'<style class="sphinx-datatables-css">{self.inline_css}</style>'
+            )
+        return "\n".join(hints)
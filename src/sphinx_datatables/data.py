@@ -0,0 +1,165 @@
+# Copyright (c) 2026 Varun Sharma
+#
+# SPDX-License-Identifier: MIT
+
+"""Streaming of CSV and JSON-lines files into static table data."""
+
+from __future__ import annotations
+
+import csv
+import functools
+import hashlib
+import html
+import io
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from .assets import HASH_LENGTH
+from .keys import text_key
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from pathlib import Path
+
+#: The formats of the files read by ``datatables-data``, by file suffix
+DATA_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+#: The size of the chunks a file is hashed in
+CHUNK_SIZE = 1 << 16
+
+
+@dataclass(frozen=True)
+class DataSource:
+    """
+    A CSV or JSON-lines file of table rows, and how to read it.
+
+    CSV files start with a header row. Each line of a JSON-lines file is an
+    object, with the keys of the first one used as the columns by default.
+    """
+
+    path: Path
+    format: str
+    columns: tuple[str, ...]
+    gzip: bool = False
+
+    def read_columns(self) -> tuple[str, ...]:
+        """Read the column names from the start of the file, without the rows."""
+        with self.path.open(newline="", encoding="utf-8") as file:
+            if self.format == "csv":
+                return tuple(next(csv.reader(file), []))
+            line = file.readline()
+        return tuple(json_object(line, 1)) if line.strip() else ()
+
+    def iter_values(self) -> Iterator[list[Any]]:
+        """Read the values of the selected columns in each row, one at a time."""
+        with self.path.open(newline="", encoding="utf-8") as file:
+            if self.format == "csv":
+                reader = csv.reader(file)
+                header = next(reader, [])
+                indices = [header.index(column) for column in self.columns]
+                for row in reader:
+                    yield [row[index] if index < len(row) else "" for index in indices]
+                return
+            for number, line in enumerate(file, 1):
+                if line.strip():
+                    item = json_object(line, number)
+                    yield [item.get(column) for column in self.columns]
+
+    def iter_rows(self) -> Iterator[list[Any]]:
+        """Read the rows as DataTables shows them, one at a time."""
+        for values in self.iter_values():
+            yield [cell_value(value) for value in values]
+
+    def iter_search_texts(self) -> Iterator[str]:
+        """Read the normalized text of each row, to search in, one at a time."""
+        for values in self.iter_values():
+            yield text_key(" ".join(search_text(value) for value in values))
+
+    @functools.cached_property
+    def digest(self) -> str:
+        """The hash of the file and how it is read, for the names of its files."""
+        digest = hashlib.sha256(
+            json.dumps([self.format, self.columns, self.gzip]).encode("utf-8")
+        )
+        with self.path.open("rb") as file:
+            while chunk := file.read(CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()[:HASH_LENGTH]
+
+    def write(self, static_dir: Path) -> str:
+        """
+        Write the rows as a JSON array of arrays, unless already written.
+
+        The rows are streamed from the source to the file, so memory use doesn't
+        grow with the size of the table. Returns the name of the file.
+        """
+        filename = f"data.{self.digest}.json{'.gz' if self.gzip else ''}"
+        write_json_array(static_dir / filename, self.iter_rows(), compress=self.gzip)
+        return filename
+
+    def write_search_corpus(self, static_dir: Path) -> str:
+        """Write the search corpus of the rows, like ``write``."""
+        filename = f"search.{self.digest}.json"
+        write_json_array(static_dir / filename, self.iter_search_texts())
+        return filename
+
+
+def write_json_array(
+    target: Path, items: Iterable[Any], *, compress: bool = False
+) -> None:
+    """
+    Stream some items into a JSON array in a file, unless it already exists.
+
+    The file is only moved into place once complete, so it is never seen partly
+    written.
+    """
+    if target.is_file():
+        return
+
+    import gzip  # noqa: PLC0415
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f"{target.name}.partial")
+    with partial.open("wb") as raw:
+        # without a timestamp, so the output is reproducible
+        binary = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) if compress else raw
+        with io.TextIOWrapper(binary, encoding="utf-8") as file:
+            file.write("[")
+            for index, item in enumerate(items):
+                if index:
+                    file.write(",")
+                file.write(json.dumps(item, separators=(",", ":")))
+            file.write("]")
+    partial.replace(target)
+
+
+def json_object(line: str, number: int) -> dict[str, Any]:
+    """Parse a line of a JSON-lines file, which must be an object."""
+    try:
+        item = json.loads(line)
+    except ValueError as exc:
+        msg = f"line {number}: {exc}"
+        raise ValueError(msg) from None
+    if not isinstance(item, dict):
+        msg = f"line {number}: expected a JSON object"
+        raise ValueError(msg)  # noqa: TRY004
+    return item
+
+
+def search_text(value: Any) -> str:  # noqa: ANN401
+    """Get the text of a value to search in."""
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def cell_value(value: Any) -> Any:  # noqa: ANN401
+    """Get a cell's value for DataTables, which renders strings as HTML."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return html.escape(value, quote=False)
+    if isinstance(value, (bool, int, float)):
+        return value
+    return html.escape(json.dumps(value), quote=False)
@@ -5,7 +5,7 @@
 """A directive for inline DataTables configuration."""
 
 import abc
-import contextlib
+import dataclasses
 import json
 import sys
 from collections.abc import Callable
@@ -13,34 +13,79 @@ from pathlib import Path
 from typing import Any, ClassVar
 
 from docutils import nodes
-from docutils.parsers.rst.directives import uri
+from docutils.parsers.rst import directives
+from docutils.parsers.rst.directives import choice, uri
 from sphinx.application import Sphinx
 from sphinx.errors import ExtensionError
+from sphinx.util import logging
 from sphinx.util.docutils import SphinxDirective
 
-from .config import SphinxDatatablesConfig
-from .js import create_datatables_js
+from .assets import content_hash
+from .config import LAZY_MODES, SphinxDatatablesConfig
+from .data import DATA_FORMATS, DataSource
+from .js import create_page_js
+from .keys import parse_keys_option
 
-HAS_TOML = False
+logger = logging.getLogger(__name__)
 
-if sys.version_info >= (3, 11):  # pragma: no cover
-    import tomllib
 
-    HAS_TOML = True
-else:  # pragma: no cover
-    with contextlib.suppress(ImportError):
-        import tomli as tomllib
+@dataclasses.dataclass(frozen=True)
+class ParsedOptionsFile:
+    """
+    The options parsed from a ``:path:`` file, and the file they were parsed from.
 
-        HAS_TOML = True
+    These are cached in the environment, and shared by every directive using the
+    file, so the parsed options must never be modified in place.
+    """
+
+    mtime_ns: int
+    size: int
+    digest: str
+    options: dict[str, Any] | str | None
+    error: str = ""
 
 
 class datatables_options(nodes.raw):  # noqa: N801
-    """A vanity node we can ``traverse`` for during ``html-page-context``."""
+    """
+    A vanity node we can ``traverse`` for during ``html-page-context``.
+
+    The ``selector`` and ``options`` attributes keep what the ``<script>`` was
+    rendered from, so it can be re-rendered after build-time table processing.
+    """
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
         """Create a new options node."""
         super().__init__(*args, **kwargs, format="html")
 
+    @classmethod
+    def from_options(
+        cls,
+        config: SphinxDatatablesConfig,
+        selector: str,
+        options: dict[str, Any] | str,
+        **attributes: Any,  # noqa: ANN401
+    ) -> "datatables_options":
+        """Create a node with the ``<script>`` for tables matching a selector."""
+        node = cls("", "", selector=selector, options=options, **attributes)
+        node.render(config)
+        return node
+
+    @property
+    def table_options(self) -> tuple[str, dict[str, Any] | str, str, str, dict]:
+        """What the ``<script>`` is rendered from, including its search, if any."""
+        return (
+            self["selector"],
+            self["options"],
+            self.get("preset", ""),
+            self.get("lazy", ""),
+            self.get("search", {}),
+        )
+
+    def render(self, config: SphinxDatatablesConfig) -> None:
+        """(Re-)render the ``<script>`` from the node's selector and options."""
+        html = create_page_js(config, [self.table_options])
+        self[:] = [nodes.Text(html)]
+
 
 class OptionsBase(SphinxDirective):
     """Emit ``DataTables`` script tag for tables on the page."""
@@ -50,37 +95,118 @@ class OptionsBase(SphinxDirective):
 
     option_spec: ClassVar[dict[str, Callable[[Any], Any]]] = {
         "path": uri,
+        "preset": directives.unchanged_required,
+        "lazy": lambda argument: choice(argument, LAZY_MODES),
+        "column-types": lambda argument: choice(argument, ("on", "off")),
+        "sort-keys": parse_keys_option,
+        "search-keys": parse_keys_option,
+        "search-worker": directives.flag,
     }
 
     def run(self) -> list[nodes.Node]:
+        """Generate a single options ``<script>``, timed if ``datatables_report``."""
+        report = self.env.datatables_report
+        if report is None:
+            return self.create_nodes()
+        with report.timer("directive run", self.env.docname):
+            return self.create_nodes()
+
+    def create_nodes(self) -> list[nodes.Node]:
         """Generate a single options ``<script>``."""
-        config = SphinxDatatablesConfig.from_sphinx_config(
-            self.state.document.settings.env.config
-        )
-        content = self.get_path_or_content()
-        config.datatables_options = self.parse_datatables_options(content)
-        config.datatables_class = self.arguments[0]
-        html = create_datatables_js(config, emit_defaults=False, emit_script_tag=True)
-        return [datatables_options("", html)]
+        path = self.get_path()
+        if path is None:
+            options = self.parse_datatables_options("\n".join(self.content))
+        else:
+            self.env.note_dependency(f"{path}")
+            parsed = self.parse_path(path)
+            if parsed.options is None:
+                # the error is reported once, for the file
+                return []
+            options = parsed.options
+
+        return [
+            datatables_options.from_options(
+                self.env.datatables_config,
+                self.arguments[0],
+                options,
+                **self.get_attributes(),
+            )
+        ]
+
+    def get_attributes(self) -> dict[str, Any]:
+        """Get the node attributes for the directive's options, if given."""
+        attributes = {}
+        if "preset" in self.options:
+            preset = self.options["preset"]
+            if preset not in self.env.datatables_config.datatables_presets:
+                msg = f"Unknown datatables preset {preset!r}"
+                raise self.error(msg)
+            attributes["preset"] = preset
+        if "lazy" in self.options:
+            attributes["lazy"] = self.options["lazy"]
+        if "column-types" in self.options:
+            attributes["column_types"] = self.options["column-types"] == "on"
+        if "sort-keys" in self.options:
+            attributes["sort_keys"] = self.options["sort-keys"]
+        if "search-keys" in self.options:
+            attributes["search_keys"] = self.options["search-keys"]
+        if "search-worker" in self.options:
+            attributes["search_worker"] = True
+        return attributes
 
     @abc.abstractmethod  # pragma: no cover
     def parse_datatables_options(self, content: str) -> dict[str, Any] | str:
         """Parse the datatables options from the directive."""
 
-    def get_path_or_content(self) -> str:
-        """Load the content from a given path or the directive content."""
+    def get_path(self) -> Path | None:
+        """Get the resolved ``:path:`` of the options file, if any."""
         path_option = self.options.get("path")
         current_source = self.state.document.current_source
-
         if path_option and current_source:
-            here = Path(current_source).parent
-            path = (here / f"{path_option}").resolve()
-            content = path.read_text(encoding="utf-8")
-            self.state.document.settings.env.note_dependency(f"{path}")
-        else:
-            content = "\n".join(self.content)
+            return (Path(current_source).parent / f"{path_option}").resolve()
+        return None
 
-        return content
+    def parse_path(self, path: Path) -> ParsedOptionsFile:
+        """
+        Parse an options file, or reuse the options already parsed from it.
+
+        Files are cached by path, and only read again if their modification time or
+        size changed, then only parsed again if their content changed. The cache is
+        kept in the environment, so it is shared by the documents read in each
+        process and kept between builds.
+        """
+        cache = self.env.datatables_options_files
+        key = (type(self).__name__, f"{path}")
+        stat = path.stat()
+        parsed = cache.get(key)
+        if parsed is not None and (parsed.mtime_ns, parsed.size) == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            return parsed
+
+        content = path.read_bytes()
+        digest = content_hash(content)
+        if parsed is not None and parsed.digest == digest:
+            parsed = dataclasses.replace(
+                parsed, mtime_ns=stat.st_mtime_ns, size=stat.st_size
+            )
+        else:
+            try:
+                options = self.parse_datatables_options(content.decode("utf-8"))
+            except ValueError as exc:
+                logger.warning(
+                    "Invalid sphinx-datatables options: %s", exc, location=f"{path}"
+                )
+                parsed = ParsedOptionsFile(
+                    stat.st_mtime_ns, stat.st_size, digest, None, f"{exc}"
+                )
+            else:
+                parsed = ParsedOptionsFile(
+                    stat.st_mtime_ns, stat.st_size, digest, options
+                )
+        cache[key] = parsed
+        return parsed
 
 
 class OptionsJSON(OptionsBase):
@@ -104,14 +230,92 @@ class OptionsTOML(OptionsBase):
 
     def parse_datatables_options(self, content: str) -> dict[str, Any]:
         """Load options from the directive content TOML."""
-        if not HAS_TOML:  # pragma: no cover
-            msg = "``datatables-toml`` requires python 3.11+ or `tomli`"
-            raise ExtensionError(msg)
+        if sys.version_info >= (3, 11):  # pragma: no cover
+            import tomllib  # noqa: PLC0415
+        else:  # pragma: no cover
+            try:
+                import tomli as tomllib  # noqa: PLC0415
+            except ImportError:
+                msg = "``datatables-toml`` requires python 3.11+ or `tomli`"
+                raise ExtensionError(msg) from None
         return tomllib.loads(content) if content else {}
 
 
+class DataFile(OptionsJSON):
+    """
+    Build a table from a CSV or JSON-lines file, loaded from static data.
+
+    Only the header of the table is included in the page. The rows are streamed
+    into a static JSON file as the page is written, which DataTables loads with
+    ``ajax``. Any content is JSON options for the table.
+    """
+
+    option_spec: ClassVar[dict[str, Callable[[Any], Any]]] = {
+        "format": lambda argument: choice(argument, tuple(set(DATA_FORMATS.values()))),
+        "columns": lambda argument: [name.strip() for name in argument.split(",")],
+        "gzip": directives.flag,
+        "class": directives.class_option,
+        "name": directives.unchanged,
+        "preset": directives.unchanged_required,
+        "lazy": lambda argument: choice(argument, LAZY_MODES),
+        "search-worker": directives.flag,
+    }
+
+    def create_nodes(self) -> list[nodes.Node]:
+        """Generate the table's header and its options ``<script>``."""
+        rel_path, path = self.env.relfn2path(self.arguments[0])
+        self.env.note_dependency(rel_path)
+        data_format = self.options.get("format", DATA_FORMATS.get(Path(path).suffix))
+        if data_format is None:
+            formats = ", ".join(sorted(set(DATA_FORMATS.values())))
+            msg = f"Unknown datatables data format, set :format: to one of: {formats}"
+            raise self.error(msg)
+        source = DataSource(Path(path), data_format, (), gzip="gzip" in self.options)
+        try:
+            available = source.read_columns()
+        except (OSError, ValueError) as exc:
+            msg = f"Cannot read datatables data {rel_path!r}: {exc}"
+            raise self.error(msg) from None
+        columns = tuple(self.options.get("columns", available))
+        missing = [column for column in columns if column not in available]
+        if missing:
+            msg = f"Unknown datatables data columns: {', '.join(missing)}"
+            raise self.error(msg)
+
+        table = data_table_header(columns, self.options.get("class", []))
+        self.add_name(table)
+        if not table["ids"]:
+            self.state.document.set_id(table)
+        options = self.parse_datatables_options("\n".join(self.content))
+        node = datatables_options.from_options(
+            self.env.datatables_config,
+            f"table#{table['ids'][0]}",
+            options,
+            data_source=dataclasses.replace(source, columns=columns),
+            table_id=table["ids"][0],
+            **self.get_attributes(),
+        )
+        return [table, node]
+
+
+def data_table_header(columns: tuple[str, ...], classes: list[str]) -> nodes.table:
+    """
+    Create a table with a header row, and an empty body for rows loaded later.
+
+    The body is kept for the other builders, whose writers expect one.
+    """
+    tgroup = nodes.tgroup(cols=len(columns))
+    tgroup.extend(nodes.colspec(colwidth=1) for _ in columns)
+    row = nodes.row()
+    row.extend(nodes.entry("", nodes.paragraph(text=column)) for column in columns)
+    tgroup += nodes.thead("", row)
+    tgroup += nodes.tbody()
+    return nodes.table("", tgroup, classes=classes)
+
+
 def add_directives(app: Sphinx) -> None:
     """Add all directives to the application."""
     app.add_directive("datatables-json", OptionsJSON)
     app.add_directive("datatables-toml", OptionsTOML)
     app.add_directive("datatables-js", OptionsJS)
+    app.add_directive("datatables-data", DataFile)
@@ -6,52 +6,246 @@
 
 from __future__ import annotations
 
+import functools
 import json
-import textwrap
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-import jinja2
-
 if TYPE_CHECKING:
+    import jinja2
+
     from .config import SphinxDatatablesConfig
 
 INDENT = " " * 4
 
+#: The number of distinct rendered scripts kept in memory
+RENDER_CACHE_SIZE = 256
+
+#: The class of tables initialized with their own options, which the default
+#: initialization of ``datatables_class`` tables skips
+OWN_OPTIONS_CLASS = "sphinx-datatables-own-options"
+
+#: How long to wait after the last keystroke before searching in a worker, in ms
+SEARCH_DEBOUNCE_MS = 150
 
-def datatables_options_to_js(options: dict | str) -> str:
+#: The number of rows a worker searches before checking for a newer query
+SEARCH_CHUNK_SIZE = 10_000
+
+
+def datatables_options_to_js(options: dict | str, *, minify: bool = False) -> str:
     """
     Convert a Python nested dictionary to a valid JS dictionary object as a str.
 
     If it's a string already, dedent and return. It will also append a comma at
-    the end if not already present.
+    the end if not already present. Dictionaries are written on a single line if
+    ``minify`` is set.
     """
     if isinstance(options, dict):
-        obj = json.dumps(options, indent=INDENT)
+        obj = (
+            json.dumps(options, separators=(",", ":"))
+            if minify
+            else json.dumps(options, indent=INDENT)
+        )
     else:  # If it's not a dict, just return whatever it is (e.g., a string)
-        obj = textwrap.dedent(options)
+        import textwrap  # noqa: PLC0415
+
+        # a leading ``;`` is not valid where an expression is expected
+        obj = textwrap.dedent(options).strip().removeprefix(";")
     if not obj.endswith(","):
         obj += ","
     return obj
 
 
+def json_literal(value: object, *, minify: bool = False) -> str:
+    """Write a value as JSON on a single line, without spaces with ``minify``."""
+    return json.dumps(value, separators=(",", ":")) if minify else json.dumps(value)
+
+
+def js_literal(source: str, *, minify: bool = False) -> str:
+    """
+    Tidy a JavaScript expression written in the code, for a page's options.
+
+    It is dedented, or written on a single line with ``minify``. Its lines must
+    then only break where no space is needed between them.
+    """
+    if minify:
+        return "".join(line.strip() for line in source.splitlines())
+    import textwrap  # noqa: PLC0415
+
+    return textwrap.dedent(source).strip()
+
+
+def minify_template(source: str) -> str:
+    """
+    Strip the comments, indentation and blank lines from a JS template.
+
+    Only whole-line ``//`` comments are removed, and every statement is kept on
+    its own line, so the script is not changed otherwise.
+    """
+    lines = (line.strip() for line in source.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+@functools.cache
+def get_template(
+    name: str = "activate_datatables.js.in", *, minify: bool = False
+) -> jinja2.Template:
+    """Load and compile a template once per process."""
+    import jinja2  # noqa: PLC0415
+
+    custom_file = Path(__file__).parent.joinpath(name)
+    source = custom_file.read_text(encoding="utf-8")
+    return jinja2.Template(
+        minify_template(source) if minify else source,
+        undefined=jinja2.StrictUndefined,
+    )
+
+
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render_datatables_js(  # noqa: PLR0913
+    datatables_options: str,
+    datatables_class: str,
+    datatables_version: str,
+    datatables_lazy: str,
+    *,
+    native: bool,
+    defer: bool,
+    minify: bool,
+    emit_defaults: bool,
+    emit_script_tag: bool,
+    emit_shards: bool,
+    emit_cache: bool,
+) -> str:
+    """Render the activation template from hashable, normalized inputs."""
+    rendered = get_template(minify=minify).render(
+        datatables_options=datatables_options,
+        datatables_class=datatables_class,
+        own_options_class=OWN_OPTIONS_CLASS,
+        datatables_lazy=datatables_lazy,
+        lazy_js=get_template("lazy_datatables.js.in", minify=minify).render(
+            native=native
+        ),
+        native=native,
+        defer=defer,
+        emit_defaults=emit_defaults,
+        emit_script_tag=emit_script_tag,
+        emit_shards=emit_shards,
+        emit_cache=emit_cache,
+    )
+
+    return rendered.replace(r"${datatables_version}", datatables_version)
+
+
 def create_datatables_js(
     config: SphinxDatatablesConfig,
     *,
     emit_defaults: bool = True,
     emit_script_tag: bool = False,
 ) -> str:
-    """Create the JS file to activate datatables."""
-    custom_file = Path(__file__).parent.joinpath("activate_datatables.js.in")
-    template = jinja2.Template(
-        custom_file.read_text(encoding="utf-8"),
-        undefined=jinja2.StrictUndefined,
-    )
-    rendered = template.render(
-        datatables_options=datatables_options_to_js(config.datatables_options),
-        datatables_class=config.datatables_class,
+    """
+    Create the JS file to activate datatables.
+
+    The options are normalized to their JS text before rendering, so identical
+    configurations share a single entry in the render cache.
+    """
+    return _render_datatables_js(
+        datatables_options_to_js(
+            config.datatables_options, minify=config.datatables_minify
+        ),
+        config.datatables_class,
+        config.datatables_version,
+        config.datatables_lazy,
+        native=config.native_api,
+        defer=config.datatables_defer,
+        minify=config.datatables_minify,
         emit_defaults=emit_defaults,
         emit_script_tag=emit_script_tag,
+        emit_shards=config.datatables_shard_size > 0,
+        emit_cache=config.datatables_cache_data,
+    )
+
+
+def preset_to_js(name: str) -> str:
+    """Get the JS expression for a named preset, from the shared presets file."""
+    return f"sphinxDatatables.presets[{json.dumps(name)}]"
+
+
+def create_presets_js(config: SphinxDatatablesConfig) -> str:
+    """Create the shared JS file defining every preset from ``datatables_presets``."""
+    minify = config.datatables_minify
+    rendered = get_template("presets_datatables.js.in", minify=minify).render(
+        datatables_presets=[
+            (json.dumps(name), datatables_options_to_js(options, minify=minify))
+            for name, options in config.datatables_presets.items()
+        ],
+    )
+
+    return rendered.replace(r"${datatables_version}", config.datatables_version)
+
+
+def create_page_js(
+    config: SphinxDatatablesConfig,
+    tables: list[tuple[str, dict | str, str, str, dict]],
+) -> str:
+    """
+    Create a single ``<script>`` for all the per-table options on a page.
+
+    Each table is given as its selector, options, the name of its preset and
+    lazy initialization mode, if any, and the URLs of its search worker and its
+    tables' search corpora, if any. Identical options are only included once,
+    and every selector is resolved in a single pass when the page is ready. If
+    the scripts are deferred, the tables are initialized by the activation script
+    instead, once it has run.
+    """
+    minify = config.datatables_minify
+    options: dict[str, int] = {}
+    selectors = []
+    for selector, table_options, preset, lazy, search in tables:
+        js = datatables_options_to_js(table_options, minify=minify)
+        if preset:
+            # the directive's own options override those of the preset
+            js = (
+                f"Object.assign({{}}, {preset_to_js(preset)}, {js.removesuffix(',')}),"
+                if table_options
+                else f"{preset_to_js(preset)},"
+            )
+        if search:
+            worker, corpora = (
+                json.dumps(search["worker"]),
+                json.dumps(search["corpora"]),
+            )
+            js = (
+                f"sphinxDatatables.withSearchWorker("
+                f"{js.removesuffix(',')}, {worker}, {corpora}),"
+            )
+        index = options.setdefault(js, len(options))
+        selectors.append((selector, index, lazy or config.datatables_lazy))
+    emit_lazy = any(lazy != "off" for _, _, lazy in selectors)
+    emit_search = any(search for *_, search in tables)
+    rendered = get_template("page_datatables.js.in", minify=minify).render(
+        datatables_options=list(options),
+        datatables_selectors=selectors,
+        emit_lazy=emit_lazy,
+        native=config.native_api,
+        defer=config.datatables_defer,
+        # the activation script already defines it, if lazy globally
+        lazy_js=get_template("lazy_datatables.js.in", minify=minify).render(
+            native=config.native_api
+        )
+        if emit_lazy and config.datatables_lazy == "off"
+        else "",
+        search_js=get_template("search_datatables.js.in", minify=minify).render(
+            debounce=SEARCH_DEBOUNCE_MS
+        )
+        if emit_search
+        else "",
     )
 
     return rendered.replace(r"${datatables_version}", config.datatables_version)
+
+
+def create_search_worker_js(config: SphinxDatatablesConfig) -> str:
+    """Create the JS file for the Web Worker searching tables' corpora."""
+    return get_template("search_worker.js.in", minify=config.datatables_minify).render(
+        chunk_size=SEARCH_CHUNK_SIZE
+    )
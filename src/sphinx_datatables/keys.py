@@ -0,0 +1,130 @@
+# Copyright (c) 2026 Varun Sharma
+#
+# SPDX-License-Identifier: MIT
+
+"""Sort and search keys for table cells, computed at build time."""
+
+from __future__ import annotations
+
+import datetime as dt
+import importlib
+import re
+from collections.abc import Callable
+from typing import Any
+
+from sphinx.errors import ExtensionError
+
+#: A function turning the text of a cell into its key
+KeyFunction = Callable[[str], Any]
+
+SIZE = re.compile(r"(?P<number>-?[\d,]*\.?\d+)\s*(?P<unit>[kmgtpe]?)(?P<binary>i?)b?")
+SIZE_EXPONENTS = {"": 0, "k": 1, "m": 2, "g": 3, "t": 4, "p": 5, "e": 6}
+
+DATE_FORMATS = ("%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y", "%m/%d/%Y")
+
+
+def number_key(text: str) -> str:
+    """Sort by the number in a cell, ignoring thousands separators and units."""
+    match = re.search(r"-?[\d,]*\.?\d+(?:[eE][-+]?\d+)?", text)
+    return f"{float(match[0].replace(',', ''))!r}" if match else ""
+
+
+def size_key(text: str) -> str:
+    """Sort sizes such as ``512 KB`` or ``1.2 GiB`` by their number of bytes."""
+    match = SIZE.fullmatch(text.strip().lower())
+    if not match:
+        return ""
+    base = 1024 if match["binary"] else 1000
+    size = float(match["number"].replace(",", ""))
+    return f"{size * base ** SIZE_EXPONENTS[match['unit']]!r}"
+
+
+def version_key(text: str) -> str:
+    """Sort versions such as ``1.10.2`` by each numeric part in turn."""
+    parts = re.findall(r"\d+|[a-z]+", text.lower())
+    return ".".join(part.zfill(8) if part.isdigit() else part for part in parts)
+
+
+def _parse_date(text: str, date_format: str | None) -> dt.datetime | None:
+    """Parse a date in a format, or ISO 8601 by default, if possible."""
+    try:
+        if date_format is None:
+            return dt.datetime.fromisoformat(text)
+        return dt.datetime.strptime(text, date_format)  # noqa: DTZ007
+    except ValueError:
+        return None
+
+
+def date_key(text: str) -> str:
+    """Sort dates in ISO 8601, or common long and short formats, as ISO 8601."""
+    for date_format in (None, *DATE_FORMATS):
+        date = _parse_date(text.strip(), date_format)
+        if date is not None:
+            return date.isoformat()
+    return ""
+
+
+def text_key(text: str) -> str:
+    """Search or sort by the text of a cell, without markup or extra whitespace."""
+    return " ".join(text.split()).casefold()
+
+
+#: The key functions which can be chosen by name
+KEY_FUNCTIONS: dict[str, KeyFunction] = {
+    "number": number_key,
+    "size": size_key,
+    "version": version_key,
+    "date": date_key,
+    "text": text_key,
+}
+
+#: The DataTables column type of the ``data-order`` values of each named key
+SORT_KEY_TYPES = {
+    "number": "num",
+    "size": "num",
+    "version": "string",
+    "date": "string",
+    "text": "string",
+}
+
+
+def get_key_function(key: str | KeyFunction) -> KeyFunction:
+    """Get a key function, by name, from a ``module:function`` path, or as given."""
+    if callable(key):
+        return key
+    if ":" in key:
+        module_name, _, name = key.partition(":")
+        try:
+            function = getattr(importlib.import_module(module_name), name)
+        except (ImportError, AttributeError) as exc:
+            msg = f"Cannot import sphinx-datatables key {key!r}: {exc}"
+            raise ExtensionError(msg) from None
+        if not callable(function):
+            msg = f"sphinx-datatables key {key!r} is not a function"
+            raise ExtensionError(msg)
+        return function
+    try:
+        return KEY_FUNCTIONS[key]
+    except KeyError:
+        names = ", ".join(KEY_FUNCTIONS)
+        msg = f"Unknown sphinx-datatables key {key!r}, expected one of: {names}"
+        raise ExtensionError(msg) from None
+
+
+def parse_keys_option(argument: str) -> dict[str, str]:
+    """
+    Parse a directive option of ``column=key`` pairs, separated by commas.
+
+    For example, ``Size=size, Released=date``.
+    """
+    keys = {}
+    for pair in argument.split(","):
+        column, _, key = (part.strip() for part in pair.rpartition("="))
+        if not column:
+            msg = f"expected column=key pairs, got {pair.strip()!r}"
+            raise ValueError(msg)
+        if key not in KEY_FUNCTIONS:
+            msg = f"unknown key {key!r}, expected one of: {', '.join(KEY_FUNCTIONS)}"
+            raise ValueError(msg)
+        keys[column] = key
+    return keys
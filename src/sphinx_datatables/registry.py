@@ -0,0 +1,85 @@
+# Copyright (c) 2026 Varun Sharma
+#
+# SPDX-License-Identifier: MIT
+
+"""A per-document registry of the tables and directives DataTables works with."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from docutils import nodes
+
+from .directives import datatables_options
+from .tables import selector_matches, table_size
+
+
+@dataclass(frozen=True)
+class TableInfo:
+    """A table which DataTables will initialize, as it was read."""
+
+    ids: tuple[str, ...]
+    classes: tuple[str, ...]
+    columns: int
+    rows: int
+
+    @classmethod
+    def from_table(cls, table: nodes.table) -> TableInfo:
+        """Describe a table from its doctree node."""
+        columns, rows = table_size(table)
+        return cls(
+            ids=tuple(table["ids"]),
+            classes=tuple(table["classes"]),
+            columns=columns,
+            rows=rows,
+        )
+
+
+@dataclass(frozen=True)
+class DirectiveInfo:
+    """The selector, options, preset, lazy mode and search given by a directive."""
+
+    selector: str
+    options: dict[str, Any] | str
+    preset: str = ""
+    lazy: str = ""
+    search: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class PageInfo:
+    """The tables and directives for DataTables in a single document."""
+
+    tables: tuple[TableInfo, ...] = ()
+    directives: tuple[DirectiveInfo, ...] = ()
+
+    def __bool__(self) -> bool:
+        """Check if the page needs DataTables at all."""
+        return bool(self.tables or self.directives)
+
+    @property
+    def rows(self) -> int:
+        """The number of body rows in all the tables on the page."""
+        return sum(table.rows for table in self.tables)
+
+    @classmethod
+    def from_doctree(cls, doctree: nodes.document, datatables_class: str) -> PageInfo:
+        """
+        Collect the tables and directives from a document, as it was read.
+
+        Tables are included if they have ``datatables_class``, or a directive's
+        selector is simple enough to be matched at build time.
+        """
+        directives = tuple(
+            DirectiveInfo(*node.table_options)
+            for node in doctree.findall(datatables_options)
+            if "selector" in node
+        )
+        tables = tuple(
+            TableInfo.from_table(table)
+            for table in doctree.findall(nodes.table)
+            if datatables_class in table["classes"]
+            or any(selector_matches(info.selector, table) for info in directives)
+        )
+        return cls(tables=tables, directives=directives)
@@ -0,0 +1,169 @@
+# Copyright (c) 2026 Varun Sharma
+#
+# SPDX-License-Identifier: MIT
+
+"""Optional build-time instrumentation, and a report of what the extension costs."""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import json
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from sphinx.application import Sphinx
+
+    from .registry import PageInfo
+
+#: The file written to the output directory when ``datatables_report`` is set
+REPORT_FILENAME = "datatables-report.json"
+
+#: The number of pages listed in the summary in the log
+SUMMARY_PAGES = 5
+
+Hook = TypeVar("Hook", bound="Callable[..., Any]")
+
+
+@dataclass
+class PageReport:
+    """What DataTables costs a single page."""
+
+    tables: int = 0
+    rows: int = 0
+    inline_script_bytes: int = 0
+    seconds: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    calls: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    @property
+    def total_seconds(self) -> float:
+        """The wall time spent on the page by all the instrumented code."""
+        return sum(self.seconds.values())
+
+
+@dataclass
+class BuildReport:
+    """
+    Wall times and sizes collected during a build.
+
+    Times are collected for the whole build, and for each page where the work is
+    done for a single document. Pages read by parallel workers are merged in with
+    their environment. The work of parallel writers is not included.
+    """
+
+    seconds: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    calls: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    pages: dict[str, PageReport] = field(
+        default_factory=lambda: defaultdict(PageReport)
+    )
+
+    @contextlib.contextmanager
+    def timer(self, name: str, docname: str | None = None) -> Iterator[None]:
+        """Time a block of code, for the whole build or a single page."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            target = self if docname is None else self.pages[docname]
+            target.seconds[name] += time.perf_counter() - start
+            target.calls[name] += 1
+
+    def merge(self, other: BuildReport, docnames: set[str]) -> None:
+        """Add the pages read by a parallel worker."""
+        for docname in docnames & other.pages.keys():
+            page, other_page = self.pages[docname], other.pages[docname]
+            for name, seconds in other_page.seconds.items():
+                page.seconds[name] += seconds
+                page.calls[name] += other_page.calls[name]
+
+    def add_registry(self, registry: dict[str, PageInfo]) -> None:
+        """Add the number of tables and rows of every page from the registry."""
+        for docname, info in registry.items():
+            page = self.pages[docname]
+            page.tables = len(info.tables)
+            page.rows = info.rows
+
+    def to_json(self) -> dict[str, Any]:
+        """Get the report, with totals for the whole build."""
+        seconds = defaultdict(float, self.seconds)
+        calls = defaultdict(int, self.calls)
+        for page in self.pages.values():
+            for name, page_seconds in page.seconds.items():
+                seconds[name] += page_seconds
+                calls[name] += page.calls[name]
+        return {
+            "seconds": dict(seconds),
+            "calls": dict(calls),
+            "pages": {
+                docname: {
+                    "tables": page.tables,
+                    "rows": page.rows,
+                    "inline_script_bytes": page.inline_script_bytes,
+                    "seconds": dict(page.seconds),
+                    "calls": dict(page.calls),
+                }
+                for docname, page in sorted(self.pages.items())
+            },
+        }
+
+    @property
+    def total_seconds(self) -> float:
+        """The wall time spent by all the instrumented code."""
+        pages = sum(page.total_seconds for page in self.pages.values())
+        return sum(self.seconds.values()) + pages
+
+    def summary(self) -> list[str]:
+        """Summarize the report in a few lines, with the most expensive pages."""
+        pages = self.pages.values()
+        tables = sum(page.tables for page in pages)
+        rows = sum(page.rows for page in pages)
+        inline_script_bytes = sum(page.inline_script_bytes for page in pages)
+        total = (
+            f"{len(self.pages)} pages, {tables} tables, {rows} rows,"
+            f" {inline_script_bytes} bytes of inline script,"
+            f" {self.total_seconds:.3f}s in total"
+        )
+        slowest = sorted(
+            self.pages.items(), key=lambda item: item[1].total_seconds, reverse=True
+        )
+        return [
+            total,
+            *(
+                f"{docname}: {page.total_seconds:.3f}s, {page.rows} rows,"
+                f" {page.inline_script_bytes} bytes of inline script"
+                for docname, page in slowest[:SUMMARY_PAGES]
+            ),
+        ]
+
+    def dumps(self) -> str:
+        """Get the report as JSON."""
+        return json.dumps(self.to_json(), indent=2)
+
+
+def timed(name: str, docname_index: int | None = None) -> Callable[[Hook], Hook]:
+    """
+    Time an event handler, if ``datatables_report`` is set.
+
+    The handler must take the application as its first argument. Handlers run
+    for a single page are timed for that page, given the index of the docname in
+    the arguments after the application.
+    """
+
+    def decorator(hook: Hook) -> Hook:
+        @functools.wraps(hook)
+        def wrapper(app: Sphinx, *args: Any) -> Any:  # noqa: ANN401
+            report: BuildReport | None = getattr(app.env, "datatables_report", None)
+            if report is None:
+                return hook(app, *args)
+            docname = None if docname_index is None else args[docname_index]
+            with report.timer(name, docname):
+                return hook(app, *args)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
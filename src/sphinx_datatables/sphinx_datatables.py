@@ -4,29 +4,100 @@
 
 """Main file for the package."""
 
+import contextlib
+import functools
+import html
 import importlib.metadata
+import re
 from pathlib import Path
 from typing import Any
 
-import packaging.version
 from docutils import nodes
 from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
 from sphinx.errors import ExtensionError
+from sphinx.util import logging
 
-from .config import SphinxDatatablesConfig
+from .assets import COMPRESSED_SUFFIXES, precompress, write_static_file
+from .config import SphinxDatatablesAssets, SphinxDatatablesConfig
 from .directives import add_directives
-from .js import create_datatables_js
+from .js import create_datatables_js, create_presets_js
+from .registry import PageInfo
+from .report import REPORT_FILENAME, BuildReport, timed
+from .tables import (
+    DATA_DIR,
+    datatables_entry,
+    depart_datatables_entry,
+    merge_options_scripts,
+    process_tables,
+    skip_small_tables,
+    visit_datatables_entry,
+)
 
+logger = logging.getLogger(__name__)
 
-def add_datatables_scripts(
-    app: Sphinx,
-    _pagename: str,
-    _templatename: str,
-    _context: dict,
-    _doctree: nodes.document,
+
+def collect_datatables(app: Sphinx, doctree: nodes.document) -> None:
+    """Record the tables and directives of the document just read."""
+    env = app.env
+    skip_small_tables(doctree, env.datatables_config)
+    page = PageInfo.from_doctree(doctree, env.datatables_config.datatables_class)
+    if page:
+        env.datatables_pages[env.docname] = page
+    else:
+        env.datatables_pages.pop(env.docname, None)
+
+
+def purge_datatables(_app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+    """Forget a document that is about to be re-read or was removed."""
+    env.datatables_pages.pop(docname, None)
+
+
+def merge_datatables(
+    _app: Sphinx,
+    env: BuildEnvironment,
+    docnames: set[str],
+    other: BuildEnvironment,
 ) -> None:
-    """Add the scripts to enable Datatables."""
+    """Merge the documents read by a parallel worker into the main environment."""
+    env.datatables_pages.update(
+        (docname, page)
+        for docname, page in other.datatables_pages.items()
+        if docname in docnames
+    )
+    env.datatables_options_files = {
+        **env.datatables_options_files,
+        **other.datatables_options_files,
+    }
+    if env.datatables_report is not None:
+        env.datatables_report.merge(other.datatables_report, docnames)
+
+
+def init_datatables(app: Sphinx) -> None:
+    """
+    Resolve the configuration and assets once, as the builder is created.
+
+    The results are stored on the build environment, where hooks and directives
+    can read them without any per-page or per-directive work.
+    """
     config = SphinxDatatablesConfig.from_sphinx_config(app.config)
+    app.env.datatables_report = BuildReport() if config.datatables_report else None
+    app.env.datatables_config = config
+    app.env.datatables_pages = getattr(app.env, "datatables_pages", {})
+    # errors are kept out of the cache between builds, so they are reported again
+    app.env.datatables_options_files = {
+        key: parsed
+        for key, parsed in getattr(app.env, "datatables_options_files", {}).items()
+        if not parsed.error
+    }
+
+    # the assets are only used, and vendored files only required, for HTML output
+    if app.builder.format != "html":
+        app.env.datatables_assets = None
+        return
+
+    assets = SphinxDatatablesAssets.from_config(config, Path(app.confdir))
+    app.env.datatables_assets = assets
 
     # Set up jQuery first, to verify it is available and gracefully output an error
     try:
@@ -38,45 +109,163 @@ def add_datatables_scripts(
         )
         raise ExtensionError(msg) from None
 
-    datetables_version_str = config.datatables_version
-    if packaging.version.parse(datetables_version_str) < packaging.version.parse(
-        "2.0.0",
+    if config.datatables_all_pages:
+        add_datatables_assets(app, assets)
+
+
+def add_datatables_assets(app: Sphinx, assets: SphinxDatatablesAssets) -> None:
+    """
+    Register the assets, globally or for the current page only.
+
+    Deferred scripts still run in the order they are added, after jQuery.
+    """
+    attributes = (
+        {"defer": "defer"} if app.env.datatables_config.datatables_defer else {}
+    )
+    app.add_js_file(assets.datatables_js, **attributes)
+    if not assets.inline_css:
+        app.add_css_file(assets.datatables_css)
+    app.add_js_file(assets.activate_js, **attributes)
+    if assets.presets_js:
+        app.add_js_file(assets.presets_js, **attributes)
+
+
+@timed("add_datatables_scripts", docname_index=0)
+def add_datatables_scripts(
+    app: Sphinx,
+    pagename: str,
+    _templatename: str,
+    context: dict,
+    _doctree: nodes.document,
+) -> None:
+    """Add the scripts to enable Datatables on the pages which need them."""
+    env = app.env
+    config = env.datatables_config
+    # otherwise, already registered for every page when the builder was created
+    if not config.datatables_all_pages:
+        if not page_needs_datatables(app, pagename):
+            return
+        add_datatables_assets(app, env.datatables_assets)
+
+    hints = env.datatables_assets.resource_hints(
+        functools.partial(static_url, context),
+        preload=config.datatables_preload,
+    )
+    if hints:
+        context["metatags"] = f"{context.get('metatags', '')}\n{hints}"
+
+
+def static_url(context: dict, filename: str) -> str | None:
+    """
+    Get the URL of a file in ``_static`` as the page's own tags load it.
+
+    The URL is taken from the tag the theme renders for the page, which may add
+    a checksum query. Returns ``None`` if the page doesn't load the file with a
+    tag it can render.
+    """
+    path = f"_static/{filename}"
+    for files, tag, attribute in (
+        ("script_files", "js_tag", "src"),
+        ("css_files", "css_tag", "href"),
     ):
-        datatables_js = f"https://cdn.datatables.net/{datetables_version_str}/js/jquery.dataTables.min.js"
-        datatables_css = f"https://cdn.datatables.net/{datetables_version_str}/css/jquery.dataTables.min.css"
-    else:
-        # for DataTables 2.0.0 and above, only the minified version is available
-        # and jQuery is not included
-        datatables_js = f"https://cdn.datatables.net/v/dt/dt-{datetables_version_str}/datatables.min.js"
-        datatables_css = f"https://cdn.datatables.net/v/dt/dt-{datetables_version_str}/datatables.min.css"
+        if tag not in context:
+            continue
+        for asset in context.get(files, []):
+            if getattr(asset, "filename", asset) == path:
+                match = re.search(f'{attribute}="([^"]*)"', context[tag](asset))
+                return html.unescape(match[1]) if match else None
+    return None
+
 
-    if config.datatables_js:
-        datatables_js = config.datatables_js
+def page_needs_datatables(app: Sphinx, pagename: str) -> bool:
+    """
+    Check if a page written by the builder has any tables for DataTables.
 
-    if config.datatables_css:
-        datatables_css = config.datatables_css
+    Builders such as ``singlehtml`` assemble every document into a single page,
+    which then needs DataTables if any of the documents does.
+    """
+    from sphinx.builders.singlehtml import SingleFileHTMLBuilder  # noqa: PLC0415
 
-    app.add_js_file(datatables_js)
-    app.add_css_file(datatables_css)
-    app.add_js_file("activate_datatables.js")
+    if isinstance(app.builder, SingleFileHTMLBuilder):
+        return bool(app.env.datatables_pages)
+    return pagename in app.env.datatables_pages
 
 
-def finish(app: Sphinx, _exception: Exception | None) -> None:
+@timed("finish")
+def finish(app: Sphinx, exception: Exception | None) -> None:
     """
     Save the assets to the static directory.
 
-    This function is called as the build finishes.
+    This function is called as the build finishes. Nothing is written if the
+    build failed or the output isn't HTML, and files which are already up-to-date
+    are left untouched.
 
     Args:
         app (Sphinx): Sphinx app
-        _exception (Exception | None): Any exceptions from the build
+        exception (Exception | None): Any exceptions from the build
 
     """
-    config = SphinxDatatablesConfig.from_sphinx_config(app.config)
-    datatables_config_contents = create_datatables_js(config)
-    asset_file = Path(app.builder.outdir) / "_static/activate_datatables.js"
-    with asset_file.open("w+") as f:
-        f.write(datatables_config_contents)
+    if exception is not None or app.builder.format != "html":
+        return
+
+    assets = app.env.datatables_assets
+    static_dir = Path(app.builder.outdir) / "_static"
+    for vendored in assets.vendored:
+        vendored.copy_to(static_dir)
+
+    report = app.env.datatables_report
+    with report.timer("create_datatables_js") if report else contextlib.nullcontext():
+        datatables_config_contents = create_datatables_js(app.env.datatables_config)
+    write_static_file(
+        static_dir, assets.activate_js, datatables_config_contents.encode("utf-8")
+    )
+    if assets.presets_js:
+        presets_contents = create_presets_js(app.env.datatables_config)
+        write_static_file(
+            static_dir, assets.presets_js, presets_contents.encode("utf-8")
+        )
+
+    encodings = app.env.datatables_config.datatables_precompress
+    if encodings:
+        with report.timer("precompress") if report else contextlib.nullcontext():
+            precompress(written_static_files(app), encodings)
+
+
+def written_static_files(app: Sphinx) -> list[Path]:
+    """Get every static file the extension wrote, without compressed siblings."""
+    assets = app.env.datatables_assets
+    static_dir = Path(app.builder.outdir) / "_static"
+    names = [assets.activate_js, assets.presets_js]
+    names.extend(vendored.filename for vendored in assets.vendored)
+    paths = [static_dir / name for name in names if name]
+    # only written if a table is searched in a worker
+    if (static_dir / assets.search_worker_js).is_file():
+        paths.append(static_dir / assets.search_worker_js)
+    data_dir = Path(app.builder.outdir) / DATA_DIR
+    if data_dir.is_dir():
+        suffixes = set(COMPRESSED_SUFFIXES.values())
+        paths.extend(
+            path
+            for path in data_dir.rglob("*")
+            if path.is_file() and path.suffix not in suffixes
+        )
+    return paths
+
+
+def write_report(app: Sphinx, exception: Exception | None) -> None:
+    """Write the build report, and summarize it in the log, if enabled."""
+    report = app.env.datatables_report
+    if exception is not None or report is None or app.builder.format != "html":
+        return
+
+    from sphinx.util.console import bold  # noqa: PLC0415
+
+    report.add_registry(app.env.datatables_pages)
+    path = Path(app.outdir) / REPORT_FILENAME
+    path.write_text(report.dumps(), encoding="utf-8")
+    logger.info("%s%s", bold("sphinx-datatables report: "), path)
+    for line in report.summary():
+        logger.info("    %s", line)
 
 
 def setup(app: Sphinx) -> dict[str, Any]:
@@ -88,15 +277,50 @@ def setup(app: Sphinx) -> dict[str, Any]:
 
     """
     app.add_config_value("datatables_version", "2.3.5", "html", str)
-    app.add_config_value("datatables_class", "sphinx-datatable", "html", str)
+    app.add_config_value("datatables_class", "sphinx-datatable", "env", str)
     app.add_config_value("datatables_options", {}, "html", [dict, str])
     app.add_config_value("datatables_js", "", "html", str)
     app.add_config_value("datatables_css", "", "html", str)
+    app.add_config_value("datatables_all_pages", False, "html", bool)  # noqa: FBT003
+    app.add_config_value("datatables_vendor_dir", "", "html", [str, Path])
+    app.add_config_value("datatables_external_data_threshold", 0, "html", int)
+    app.add_config_value("datatables_shard_size", 0, "html", int)
+    app.add_config_value("datatables_column_types", False, "html", bool)  # noqa: FBT003
+    app.add_config_value("datatables_sort_keys", {}, "html", dict)
+    app.add_config_value("datatables_search_keys", {}, "html", dict)
+    # read by directives, so changing them requires reading documents again
+    app.add_config_value("datatables_presets", {}, "env", dict)
+    app.add_config_value("datatables_report", False, "", bool)  # noqa: FBT003
+    app.add_config_value("datatables_lazy", "off", "html", str)
+    app.add_config_value("datatables_min_rows", 0, "env", int)
+    app.add_config_value("datatables_large_cells", 0, "html", int)
+    app.add_config_value("datatables_defer", False, "html", bool)  # noqa: FBT003
+    app.add_config_value("datatables_preload", False, "html", bool)  # noqa: FBT003
+    app.add_config_value("datatables_inline_css", False, "html", bool)  # noqa: FBT003
+    app.add_config_value("datatables_minify", False, "html", bool)  # noqa: FBT003
+    app.add_config_value("datatables_precompress", [], "html", [list, tuple])
+    app.add_config_value("datatables_cache_data", False, "html", bool)  # noqa: FBT003
+    app.add_config_value(
+        "datatables_large_options",
+        {"autoWidth": False, "deferRender": True, "paging": True},
+        "html",
+        dict,
+    )
 
     add_directives(app)
+    app.add_node(
+        datatables_entry, html=(visit_datatables_entry, depart_datatables_entry)
+    )
 
+    app.connect("builder-inited", init_datatables)
+    app.connect("doctree-read", collect_datatables)
+    app.connect("env-purge-doc", purge_datatables)
+    app.connect("env-merge-info", merge_datatables)
+    app.connect("doctree-resolved", process_tables)
+    app.connect("doctree-resolved", merge_options_scripts)
     app.connect("html-page-context", add_datatables_scripts)
     app.connect("build-finished", finish)
+    app.connect("build-finished", write_report)
 
     return {
         "version": importlib.metadata.version("sphinx_datatables"),
@@ -0,0 +1,744 @@
+# Copyright (c) 2026 Varun Sharma
+#
+# SPDX-License-Identifier: MIT
+
+"""Build-time processing of tables."""
+
+from __future__ import annotations
+
+import datetime as dt
+import html
+import json
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from docutils import nodes
+from sphinx.util import logging
+from sphinx.util.osutil import relative_uri
+
+from .assets import content_hash, hashed_filename, write_static_file
+from .directives import datatables_options
+from .js import (
+    OWN_OPTIONS_CLASS,
+    create_page_js,
+    create_search_worker_js,
+    js_literal,
+    json_literal,
+)
+from .keys import SORT_KEY_TYPES, KeyFunction, get_key_function, text_key
+from .report import timed
+
+if TYPE_CHECKING:
+    from sphinx.application import Sphinx
+    from sphinx.builders import Builder
+    from sphinx.writers.html5 import HTML5Translator
+
+    from .config import SphinxDatatablesConfig
+    from .data import DataSource
+
+logger = logging.getLogger(__name__)
+
+#: Where extracted table data is written, relative to the output directory
+DATA_DIR = "_static/datatables-data"
+
+#: A selector made of an optional ``table`` and any ``.class`` or ``#id`` parts
+SIMPLE_SELECTOR = re.compile(r"(?:table)?(?P<names>(?:[.#][\w-]+)+)")
+
+#: A plain number, as detected by DataTables' ``num`` type
+NUMBER = re.compile(r"-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?")
+
+
+def table_body_rows(table: nodes.table) -> list[nodes.row] | None:
+    """
+    Get the body rows of a simple table, or ``None`` if it cannot be extracted.
+
+    Only tables with a single ``tgroup``, and no cells spanning several rows or
+    columns, are supported, matching what DataTables itself can handle.
+    """
+    tgroups = [child for child in table.children if isinstance(child, nodes.tgroup)]
+    if len(tgroups) != 1:
+        return None
+    tgroup = tgroups[0]
+    bodies = [child for child in tgroup.children if isinstance(child, nodes.tbody)]
+    if len(bodies) != 1:
+        return None
+
+    rows = [row for row in bodies[0].children if isinstance(row, nodes.row)]
+    for row in rows:
+        if len(row) != tgroup["cols"]:
+            return None
+        if any(entry.get("morerows") or entry.get("morecols") for entry in row):
+            return None
+    return rows
+
+
+def table_size(table: nodes.table) -> tuple[int, int]:
+    """Count the columns and body rows of a table, in all its groups."""
+    tgroups = list(table.findall(nodes.tgroup))
+    columns = max((tgroup["cols"] for tgroup in tgroups), default=0)
+    rows = sum(
+        len(tbody.children)
+        for tgroup in tgroups
+        for tbody in tgroup.findall(nodes.tbody)
+    )
+    return columns, rows
+
+
+def skip_small_tables(doctree: nodes.document, config: SphinxDatatablesConfig) -> None:
+    """
+    Leave ``datatables_class`` tables with too few rows as plain tables.
+
+    This is done as documents are read, so pages left without any tables don't
+    load DataTables at all.
+    """
+    if config.datatables_min_rows <= 0:
+        return
+    for table in doctree.findall(nodes.table):
+        if config.datatables_class not in table["classes"]:
+            continue
+        if table_size(table)[1] < config.datatables_min_rows:
+            table["classes"].remove(config.datatables_class)
+
+
+def large_table_options(
+    config: SphinxDatatablesConfig, table: nodes.table
+) -> dict[str, Any]:
+    """Get the ``datatables_large_options`` for a table with many cells, or none."""
+    columns, rows = table_size(table)
+    if 0 < config.datatables_large_cells < columns * rows:
+        return dict(config.datatables_large_options)
+    return {}
+
+
+def _is_plain_text(entry: nodes.entry) -> bool:
+    """Check if a cell holds only a paragraph of plain text."""
+    return len(entry) == 0 or (
+        len(entry) == 1
+        and isinstance(entry[0], nodes.paragraph)
+        and all(isinstance(child, nodes.Text) for child in entry[0].children)
+    )
+
+
+def cell_html(builder: Builder, entry: nodes.entry) -> str:
+    """Render the content of a table cell to HTML."""
+    if _is_plain_text(entry):
+        return html.escape(entry.astext(), quote=False)
+
+    fragments = []
+    for child in entry.children:
+        fragment = builder.render_partial(child.deepcopy())["fragment"].strip()
+        if isinstance(child, nodes.paragraph) and len(entry) == 1:
+            # a lone paragraph is rendered compactly in a cell
+            fragment = fragment.removeprefix("<p>").removesuffix("</p>")
+        fragments.append(fragment)
+    return "\n".join(fragments)
+
+
+def selector_matches(selector: str, table: nodes.table) -> bool:
+    """
+    Check if a simple CSS selector list matches a table.
+
+    Only ``table``, ``.class`` and ``#id`` parts are understood, such as
+    ``table.custom-table, #other``. More complex selectors never match.
+    """
+    for part in selector.split(","):
+        match = SIMPLE_SELECTOR.fullmatch(part.strip())
+        if not match:
+            continue
+        names = re.findall(r"([.#])([\w-]+)", match["names"])
+        if all(
+            name in (table["classes"] if kind == "." else table["ids"])
+            for kind, name in names
+        ):
+            return True
+    return False
+
+
+def column_type(entries: list[nodes.entry]) -> str:
+    """
+    Classify a column with one of DataTables' built-in data types.
+
+    This matches the type DataTables would detect in the browser, where it would
+    otherwise scan every cell before the first draw.
+    """
+    values = [entry.astext().strip() for entry in entries]
+    values = [value for value in values if value]
+    is_html = not all(_is_plain_text(entry) for entry in entries)
+    if values and all(NUMBER.fullmatch(value) for value in values):
+        column = "num"
+    elif values and all(_is_number(value) for value in values):
+        column = "num-fmt"
+    elif values and all(_is_date(value) for value in values):
+        return "date"
+    else:
+        return "html" if is_html else "string"
+    return f"html-{column}" if is_html else column
+
+
+def column_type_defs(rows: list[nodes.row]) -> list[dict[str, Any]]:
+    """Get ``columnDefs`` entries setting the type of each column of a table."""
+    columns = zip(*(row.children for row in rows), strict=True)
+    return [
+        {"targets": index, "type": column_type(list(entries))}
+        for index, entries in enumerate(columns)
+    ]
+
+
+def merge_column_defs(
+    options: dict[str, Any], column_defs: list[dict]
+) -> dict[str, Any]:
+    """
+    Add build-time ``columnDefs`` to a copy of some options.
+
+    They are added after any existing definitions, which DataTables gives
+    priority, so options set by the user always win.
+    """
+    return {**options, "columnDefs": [*options.get("columnDefs", []), *column_defs]}
+
+
+def merge_shared_column_defs(
+    node: datatables_options, tables_defs: list[list[dict[str, Any]]]
+) -> bool:
+    """
+    Add the build-time ``columnDefs`` all the tables of a directive agree on.
+
+    The tables share the directive's options, so a column's type is only given
+    if it is the same in every table. Returns whether the options were changed.
+    """
+    first, *others = tables_defs
+    shared = [
+        column_def
+        for column_def in first
+        if all(column_def in table_defs for table_defs in others)
+    ]
+    if shared:
+        node["options"] = merge_column_defs(node["options"], shared)
+    return bool(shared)
+
+
+def _is_date(value: str) -> bool:
+    """Check if a cell value is an ISO 8601 date or date and time."""
+    try:
+        dt.datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_number(value: str) -> bool:
+    """Check if a cell value is numeric, allowing thousands separators."""
+    return NUMBER.fullmatch(value.replace(",", "")) is not None
+
+
+def column_order(values: list[str]) -> list[int]:
+    """
+    Get the row indices of a column in ascending order.
+
+    Columns where every non-empty value is a number are sorted numerically, and
+    all others by case-insensitive text, similar to DataTables' own ordering.
+    Values which are not numbers sort first in a numeric column, as missing.
+    """
+    if all(_is_number(value) for value in values if value):
+        keys: list[Any] = [
+            float(value.replace(",", "")) if _is_number(value) else float("-inf")
+            for value in values
+        ]
+    else:
+        keys = [value.casefold() for value in values]
+    return sorted(range(len(values)), key=keys.__getitem__)
+
+
+def write_shards(
+    data_dir: Path, rows: list[nodes.row], data: list[list[str]], size: int
+) -> None:
+    """
+    Write the table data as fixed-size shards, in natural and each column's order.
+
+    The ``n`` directory holds the rows in their original order, and each numbered
+    directory holds them in ascending order of that column. A descending order is
+    read backwards from the ascending shards.
+    """
+    orders = {"n": list(range(len(data)))}
+    for column in range(len(data[0]) if data else 0):
+        orders[f"{column}"] = column_order([row[column].astext() for row in rows])
+
+    for name, order in orders.items():
+        for index, start in enumerate(range(0, len(order), size)):
+            shard = [data[i] for i in order[start : start + size]]
+            write_static_file(
+                data_dir / name,
+                f"{index}.json",
+                json.dumps(shard, separators=(",", ":")).encode("utf-8"),
+            )
+
+    manifest = {"rows": len(data), "shardSize": size, "orders": list(orders)}
+    write_static_file(data_dir, "manifest.json", json.dumps(manifest).encode("utf-8"))
+
+
+def extract_table_data(
+    app: Sphinx,
+    docname: str,
+    rows: list[nodes.row],
+) -> dict[str, Any] | str:
+    """
+    Move the body rows of a table into external JSON files.
+
+    Only the header stays in the page. The returned options load the rows with
+    ``ajax`` and ``deferRender``, so only the rows which are displayed are ever
+    built in the browser.
+
+    With ``datatables_shard_size``, the rows are split into shards which are
+    fetched on demand, emulating DataTables' server-side processing. Otherwise,
+    with ``datatables_cache_data``, the rows are kept in the browser's IndexedDB.
+    """
+    builder = app.builder
+    config = app.env.datatables_config
+    page_uri = builder.get_target_uri(docname)
+    # the cells are rendered before the page is written, which sets these paths
+    builder.imgpath = relative_uri(page_uri, "_images")
+    builder.dlpath = relative_uri(page_uri, "_downloads")
+    data = [[cell_html(builder, entry) for entry in row] for row in rows]
+    content = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    static_dir = Path(builder.outdir) / DATA_DIR
+
+    options: dict[str, Any] | str
+    if config.datatables_shard_size > 0:
+        name = content_hash(b"%d:%s" % (config.datatables_shard_size, content))
+        write_shards(static_dir / name, rows, data, config.datatables_shard_size)
+        url = relative_uri(page_uri, f"{DATA_DIR}/{name}")
+        options = js_literal(
+            f"""
+            {{
+                serverSide: true,
+                searching: false,
+                deferRender: true,
+                ajax: sphinxDatatables.shardedAjax({json.dumps(url)}),
+            }}""",
+            minify=config.datatables_minify,
+        )
+    else:
+        filename = hashed_filename("data.json", content)
+        write_static_file(static_dir, filename, content)
+        url = relative_uri(page_uri, f"{DATA_DIR}/{filename}")
+        options = (
+            cached_ajax_options(
+                url, content_hash(content), minify=config.datatables_minify
+            )
+            if config.datatables_cache_data
+            else {"ajax": {"url": url, "dataSrc": ""}, "deferRender": True}
+        )
+
+    for row in rows:
+        row.parent.remove(row)
+
+    return options
+
+
+def data_file_options(app: Sphinx, docname: str, source: DataSource) -> dict | str:
+    """
+    Write the rows of a ``datatables-data`` file, and get the options to load them.
+
+    A gzipped file is decompressed in the browser, as static servers don't mark
+    it with a ``Content-Encoding``.
+    """
+    builder = app.builder
+    config = app.env.datatables_config
+    filename = source.write(Path(builder.outdir) / DATA_DIR)
+    url = relative_uri(builder.get_target_uri(docname), f"{DATA_DIR}/{filename}")
+    if config.datatables_cache_data:
+        return cached_ajax_options(
+            url, source.digest, gzip=source.gzip, minify=config.datatables_minify
+        )
+    if not source.gzip:
+        return {"ajax": {"url": url, "dataSrc": ""}, "deferRender": True}
+
+    return js_literal(
+        f"""
+        {{
+            deferRender: true,
+            ajax: function (data, callback) {{
+                fetch({json.dumps(url)})
+                    .then((r) => new Response(
+                        r.body.pipeThrough(new DecompressionStream("gzip"))
+                    ).json())
+                    .then((rows) => callback({{ data: rows }}));
+            }},
+        }}""",
+        minify=config.datatables_minify,
+    )
+
+
+def cached_ajax_options(
+    url: str, digest: str, *, gzip: bool = False, minify: bool = False
+) -> str:
+    """
+    Get the options to load the rows of a table through the IndexedDB cache.
+
+    The rows are only fetched again once the hash of their content changes.
+    """
+    args = ", ".join([json.dumps(url), json.dumps(digest), json.dumps(gzip)])
+    return js_literal(
+        f"""
+        {{
+            deferRender: true,
+            ajax: sphinxDatatables.cachedAjax({args}),
+        }}""",
+        minify=minify,
+    )
+
+
+def write_search_corpus(app: Sphinx, docname: str, rows: list[nodes.row]) -> str:
+    """
+    Write the normalized text of each row of a table, for its search worker.
+
+    The text of the cells is stripped of any markup, and lowercased, as it is
+    searched. Returns the URL of the file, relative to the page.
+    """
+    corpus = [text_key(" ".join(entry.astext() for entry in row)) for row in rows]
+    content = json.dumps(corpus, separators=(",", ":")).encode("utf-8")
+    filename = hashed_filename("search.json", content)
+    write_static_file(Path(app.builder.outdir) / DATA_DIR, filename, content)
+    return relative_uri(app.builder.get_target_uri(docname), f"{DATA_DIR}/{filename}")
+
+
+def add_search_worker(
+    app: Sphinx, docname: str, node: datatables_options, corpora: dict[str, str]
+) -> None:
+    """Search the tables of a directive in a worker, with their search corpora."""
+    name = app.env.datatables_assets.search_worker_js
+    content = create_search_worker_js(app.env.datatables_config).encode("utf-8")
+    write_static_file(Path(app.builder.outdir) / "_static", name, content)
+    node["search"] = {
+        "worker": relative_uri(app.builder.get_target_uri(docname), f"_static/{name}"),
+        "corpora": corpora,
+    }
+
+
+def load_data_file(app: Sphinx, docname: str, node: datatables_options) -> bool:
+    """
+    Add the options loading a ``datatables-data`` file to its directive's options.
+
+    The directive's own options take priority. Returns whether they were changed.
+    """
+    try:
+        options = data_file_options(app, docname, node["data_source"])
+    except (OSError, ValueError) as exc:
+        logger.warning(
+            "Cannot write datatables data: %s",
+            exc,
+            location=f"{node['data_source'].path}",
+        )
+        return False
+    if isinstance(options, dict):
+        node["options"] = {**options, **node["options"]}
+    else:
+        user_options = json_literal(
+            node["options"], minify=app.env.datatables_config.datatables_minify
+        )
+        node["options"] = f"Object.assign({options}, {user_options})"
+    if node.get("search_worker"):
+        filename = node["data_source"].write_search_corpus(
+            Path(app.builder.outdir) / DATA_DIR
+        )
+        url = relative_uri(
+            app.builder.get_target_uri(docname), f"{DATA_DIR}/{filename}"
+        )
+        add_search_worker(app, docname, node, {node["table_id"]: url})
+    return True
+
+
+def configure_table(
+    app: Sphinx,
+    doctree: nodes.document,
+    table: nodes.table,
+    options: dict[str, Any] | str,
+) -> None:
+    """
+    Initialize a ``datatables_class`` table with its own options instead.
+
+    The table keeps its class, and is marked so the default initialization skips
+    it. It is then initialized by a ``<script>`` inserted after it, selecting it
+    by ID.
+    """
+    config = app.env.datatables_config
+    table["classes"].append(OWN_OPTIONS_CLASS)
+    if not table["ids"]:
+        doctree.set_id(table)
+
+    node = datatables_options.from_options(config, f"table#{table['ids'][0]}", options)
+    table.parent.insert(table.parent.index(table) + 1, node)
+
+
+class datatables_entry(nodes.entry):  # noqa: N801
+    """A table cell with extra HTML attributes, such as ``data-order``."""
+
+
+def visit_datatables_entry(translator: HTML5Translator, node: datatables_entry) -> None:
+    """Write a cell's start tag with its extra HTML attributes."""
+    start = len(translator.body)
+    translator.visit_entry(node)
+    attributes = "".join(
+        f' {name}="{html.escape(value)}"'
+        for name, value in node["datatables_attributes"].items()
+    )
+    tag = translator.body[start]
+    end = tag.index(">")
+    translator.body[start] = f"{tag[:end]}{attributes}{tag[end:]}"
+
+
+def depart_datatables_entry(
+    translator: HTML5Translator, node: datatables_entry
+) -> None:
+    """Close a cell with extra HTML attributes."""
+    translator.depart_entry(node)
+
+
+def column_labels(table: nodes.table) -> list[str]:
+    """Get the text of the last header row of a table, or nothing without one."""
+    header_rows = [row for thead in table.findall(nodes.thead) for row in thead]
+    return [entry.astext().strip() for entry in header_rows[-1]] if header_rows else []
+
+
+def key_columns(
+    table: nodes.table, keys: dict[str | int, str | KeyFunction]
+) -> dict[int, str | KeyFunction]:
+    """
+    Get the keys of a table by column index, given by header text or index.
+
+    Keys for columns the table doesn't have are skipped, so the same keys can
+    be given for every table of a site.
+    """
+    labels = column_labels(table)
+    columns = table_size(table)[0]
+    resolved = {}
+    for column, key in keys.items():
+        if isinstance(column, int):
+            if -columns <= column < columns:
+                resolved[column % columns] = key
+        elif column in labels:
+            resolved[labels.index(column)] = key
+    return resolved
+
+
+def sort_key_column_defs(
+    column_defs: list[dict[str, Any]], sort_keys: dict[int, str | KeyFunction]
+) -> list[dict[str, Any]]:
+    """
+    Set the type of the columns with sort keys from the kind of key instead.
+
+    DataTables sorts these columns by their ``data-order`` values, not the text
+    the types were detected from. Columns with a custom key function are left
+    for DataTables to detect.
+    """
+    result = []
+    for column_def in column_defs:
+        key = sort_keys.get(column_def["targets"])
+        if key is None:
+            result.append(column_def)
+        elif isinstance(key, str) and key in SORT_KEY_TYPES:
+            result.append({**column_def, "type": SORT_KEY_TYPES[key]})
+    return result
+
+
+def add_cell_keys(
+    table: nodes.table,
+    rows: list[nodes.row],
+    sort_keys: dict[str | int, str | KeyFunction],
+    search_keys: dict[str | int, str | KeyFunction],
+) -> None:
+    """
+    Add precomputed ``data-order`` and ``data-search`` attributes to cells.
+
+    Keys are given for a column by its header text, or its index. DataTables
+    then sorts and searches these values without parsing the cells' HTML.
+    """
+    attributes: list[tuple[int, str, KeyFunction]] = [
+        (index, name, get_key_function(key))
+        for name, keys in [("data-order", sort_keys), ("data-search", search_keys)]
+        for index, key in key_columns(table, keys).items()
+    ]
+    if not attributes:
+        return
+
+    for row in rows:
+        for index, name, key_function in attributes:
+            entry = row[index]
+            if not isinstance(entry, datatables_entry):
+                new_entry = datatables_entry(
+                    entry.rawsource, *entry.children, **entry.attributes
+                )
+                new_entry["datatables_attributes"] = {}
+                entry.replace_self(new_entry)
+                entry = new_entry
+            entry["datatables_attributes"][name] = f"{key_function(entry.astext())}"
+
+
+def process_table(
+    app: Sphinx,
+    doctree: nodes.document,
+    docname: str,
+    table: nodes.table,
+    directive: datatables_options | None,
+) -> list[dict[str, Any]] | None:
+    """
+    Apply the build-time processing to a single table.
+
+    Tables using ``datatables_class`` are given their own options when needed.
+    Tables initialized by a directive instead share its options, so their
+    build-time ``columnDefs`` are returned, to merge into the directive's
+    options, or ``None`` if they cannot be.
+    """
+    config = app.env.datatables_config
+    rows = table_body_rows(table)
+    if rows is None:
+        if config.datatables_class in table["classes"]:
+            configure_default_table(app, doctree, docname, table, [])
+            return None
+        return []
+
+    column_types = config.datatables_column_types
+    sort_keys = dict(config.datatables_sort_keys)
+    search_keys = dict(config.datatables_search_keys)
+    if directive is not None:
+        column_types = directive.get("column_types", column_types)
+        sort_keys.update(directive.get("sort_keys", {}))
+        search_keys.update(directive.get("search_keys", {}))
+    column_defs = column_type_defs(rows) if column_types else []
+
+    threshold = config.datatables_external_data_threshold
+    is_extracted = (
+        config.datatables_class in table["classes"]
+        and 0 < threshold < len(rows)
+        # images are only given their URLs in the page once it is resolved
+        and not any(next(row.findall(nodes.image), None) for row in rows)
+    )
+    if (sort_keys or search_keys) and not is_extracted:
+        add_cell_keys(table, rows, sort_keys, search_keys)
+        column_defs = sort_key_column_defs(column_defs, key_columns(table, sort_keys))
+
+    if config.datatables_class not in table["classes"]:
+        # the directive initializes this table, so extend its options
+        if directive is None or not isinstance(directive["options"], dict):
+            return None
+        return column_defs
+
+    configure_default_table(
+        app,
+        doctree,
+        docname,
+        table,
+        column_defs,
+        extracted_rows=rows if is_extracted else None,
+    )
+    return None
+
+
+def configure_default_table(  # noqa: PLR0913
+    app: Sphinx,
+    doctree: nodes.document,
+    docname: str,
+    table: nodes.table,
+    column_defs: list[dict],
+    *,
+    extracted_rows: list[nodes.row] | None = None,
+) -> None:
+    """
+    Give a ``datatables_class`` table the options it needs, if any.
+
+    These are the ``datatables_large_options`` for a large table, any build-time
+    ``columnDefs``, and finally those to load any extracted rows.
+    """
+    options: dict[str, Any] | str = large_table_options(
+        app.env.datatables_config, table
+    )
+    if column_defs:
+        options = merge_column_defs(options, column_defs)
+    if extracted_rows is not None:
+        extracted = extract_table_data(app, docname, extracted_rows)
+        if isinstance(extracted, dict):
+            options = {**options, **extracted}
+        else:
+            minify = app.env.datatables_config.datatables_minify
+            options = (
+                f"Object.assign({json_literal(options, minify=minify)}, {extracted})"
+                if options
+                else extracted
+            )
+    if options:
+        configure_table(app, doctree, table, options)
+
+
+@timed("process_tables", docname_index=1)
+def process_tables(app: Sphinx, doctree: nodes.document, docname: str) -> None:
+    """Apply the build-time processing to the tables on a page."""
+    if app.builder.format != "html":
+        return
+
+    config = app.env.datatables_config
+    directives = [
+        node for node in doctree.findall(datatables_options) if "selector" in node
+    ]
+    updated = {
+        node
+        for node in directives
+        if "data_source" in node and load_data_file(app, docname, node)
+    }
+
+    corpora: dict[datatables_options, dict[str, str]] = {}
+    column_defs: dict[datatables_options, list[list[dict[str, Any]]]] = {}
+
+    for table in list(doctree.findall(nodes.table)):
+        directive = next(
+            (node for node in directives if selector_matches(node["selector"], table)),
+            None,
+        )
+        if config.datatables_class not in table["classes"] and directive is None:
+            continue
+        rows = table_body_rows(table)
+        if directive is not None and directive.get("search_worker") and rows:
+            # before any rows are moved out of the page
+            if not table["ids"]:
+                doctree.set_id(table)
+            corpora.setdefault(directive, {})[table["ids"][0]] = write_search_corpus(
+                app, docname, rows
+            )
+        table_defs = process_table(app, doctree, docname, table, directive)
+        if directive is not None and table_defs is not None:
+            column_defs.setdefault(directive, []).append(table_defs)
+
+    updated.update(
+        node
+        for node, tables_defs in column_defs.items()
+        if merge_shared_column_defs(node, tables_defs)
+    )
+
+    for node, node_corpora in corpora.items():
+        add_search_worker(app, docname, node, node_corpora)
+        updated.add(node)
+
+    for node in updated:
+        node.render(config)
+
+
+@timed("merge_options_scripts", docname_index=1)
+def merge_options_scripts(app: Sphinx, doctree: nodes.document, docname: str) -> None:
+    """Replace all the per-table ``<script>`` tags on a page with a single one."""
+    if app.builder.format != "html":
+        return
+
+    found = list(doctree.findall(datatables_options))
+    if not found:
+        return
+    for node in found:
+        node.parent.remove(node)
+
+    html_script = create_page_js(
+        app.env.datatables_config,
+        [node.table_options for node in found],
+    )
+    doctree.append(datatables_options("", html_script))
+    if app.env.datatables_report is not None:
+        app.env.datatables_report.pages[docname].inline_script_bytes = len(
+            html_script.encode("utf-8")
+        )
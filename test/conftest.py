@@ -11,7 +11,7 @@ from pathlib import Path
 import pytest
 from packaging.version import Version
 
-__all__ = ["SphinxTestPath", "basic_site"]
+__all__ = ["SphinxTestPath", "append_conf", "basic_site"]
 
 if Version(importlib.metadata.version("sphinx")) >= Version("7"):
     SphinxTestPath = Path
@@ -19,6 +19,15 @@ else:
     from sphinx.testing.path import path as SphinxTestPath  # noqa: N812
 
 
+def append_conf(site: Path, *lines: str) -> None:
+    """Add some lines to the ``conf.py`` of a site."""
+    conf_py = site / "conf.py"
+    conf_py.write_text(
+        "\n".join([conf_py.read_text(encoding="utf-8"), *lines]),
+        encoding="utf-8",
+    )
+
+
 @pytest.fixture
 def basic_site(tmp_path: Path) -> Path:
     """Provide a basic site folder with a single page with a table and config."""
@@ -4,6 +4,11 @@
 
 """Directive tests for sphinx-datatables."""
 
+import dataclasses
+import gzip
+import json
+import shutil
+import subprocess
 import sys
 import textwrap
 from io import StringIO
@@ -12,7 +17,11 @@ from pathlib import Path
 import pytest
 from sphinx.testing.util import SphinxTestApp
 
-from .conftest import SphinxTestPath
+from sphinx_datatables.data import DataSource
+from sphinx_datatables.directives import OptionsJSON
+from sphinx_datatables.js import SEARCH_DEBOUNCE_MS, get_template
+
+from .conftest import SphinxTestPath, append_conf
 
 NL = "\n"
 
@@ -71,7 +80,516 @@ def test_json_directive(
     sys.stderr.write(f"{NL}{io.getvalue()}{NL}")
     assert app.statuscode == 0
     index_html = (build / "html/index.html").read_text(encoding="utf-8")
-    assert (
-        "$(`table.custom-datatable`).filter(':not(.dataTable)').DataTable("
-        in index_html
+    assert "[`table.custom-datatable`, 0]," in index_html
+
+
+def test_merged_scripts(basic_site: Path, tmp_path: Path) -> None:
+    """Test the directives on a page are merged into one deduplicated script."""
+    build = tmp_path / "build"
+    index_rst = basic_site / "index.rst"
+    directives = "".join(
+        textwrap.dedent(f"""
+
+            .. datatables-json:: {selector}
+
+                {options}
+            """)
+        for selector, options in [
+            ("table.first", '{"searching": false}'),
+            ("table.second", '{"paging": false}'),
+            ("table.third", '{"searching": false}'),
+        ]
+    )
+    index_rst.write_text(f"test{NL}===={NL}{directives}", encoding="utf-8")
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+    index_html = (build / "html/index.html").read_text(encoding="utf-8")
+    assert index_html.count('<script class="sphinx-datatables-config">') == 1
+    assert index_html.count('addEventListener("DOMContentLoaded"') == 1
+    assert index_html.count('"searching": false') == 1
+    assert "[`table.first`, 0]," in index_html
+    assert "[`table.second`, 1]," in index_html
+    assert "[`table.third`, 0]," in index_html
+
+
+def test_presets(basic_site: Path, tmp_path: Path) -> None:
+    """Test presets are shared in one static file, and selected by name."""
+    build = tmp_path / "build"
+    append_conf(basic_site, "datatables_presets = {'compact': {'paging': False}}")
+    for name, body in [("one", ""), ("two", '{"searching": false}')]:
+        (basic_site / f"{name}.rst").write_text(
+            textwrap.dedent(f"""
+                :orphan:
+
+                {name}
+                ===
+
+                .. datatables-json:: table.custom-datatable
+                    :preset: compact
+
+                    {body}
+                """),
+            encoding="utf-8",
+        )
+    (basic_site / "three.rst").write_text(
+        textwrap.dedent("""
+            :orphan:
+
+            .. datatables-json:: table.custom-datatable
+                :preset: missing
+            """),
+        encoding="utf-8",
+    )
+
+    io = StringIO()
+    app = SphinxTestApp(
+        "html",
+        SphinxTestPath(basic_site),
+        SphinxTestPath(build),
+        warning=io,
+    )
+    app.build()
+    assert app.statuscode == 0
+    assert "Unknown datatables preset 'missing'" in io.getvalue()
+
+    html = build / "html"
+    (presets_js,) = (html / "_static").glob("presets_datatables.*.js")
+    assert '"paging": false' in presets_js.read_text(encoding="utf-8")
+    one_html = (html / "one.html").read_text(encoding="utf-8")
+    two_html = (html / "two.html").read_text(encoding="utf-8")
+    assert f'src="_static/{presets_js.name}"' in one_html
+    assert '"paging": false' not in one_html
+    assert 'sphinxDatatables.presets["compact"],' in one_html
+    assert 'Object.assign({}, sphinxDatatables.presets["compact"], {' in two_html
+
+
+def test_cached_path(
+    basic_site: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test ``:path:`` files are parsed once, and errors reported once per file."""
+    parsed: list[str] = []
+    parse = OptionsJSON.parse_datatables_options
+
+    def counting_parse(self: OptionsJSON, content: str) -> dict:
+        parsed.append(content)
+        return parse(self, content)
+
+    monkeypatch.setattr(OptionsJSON, "parse_datatables_options", counting_parse)
+
+    options_json = basic_site / "options.json"
+    options_json.write_text('{"searching": false}', encoding="utf-8")
+    broken_json = basic_site / "broken.json"
+    broken_json.write_text("{", encoding="utf-8")
+    for name in ("one", "two", "three"):
+        (basic_site / f"{name}.rst").write_text(
+            textwrap.dedent(f"""
+                :orphan:
+
+                .. datatables-json:: table.custom-datatable
+                    :path: options.json
+
+                .. datatables-json:: table.{name}
+                    :path: broken.json
+                """),
+            encoding="utf-8",
+        )
+
+    def build() -> str:
+        warnings = StringIO()
+        app = SphinxTestApp(
+            "html",
+            SphinxTestPath(basic_site),
+            SphinxTestPath(tmp_path / "build"),
+            warning=warnings,
+        )
+        app.build()
+        assert app.statuscode == 0
+        return warnings.getvalue()
+
+    warnings = build()
+    assert sorted(parsed) == ["{", '{"searching": false}']
+    assert warnings.count("Invalid sphinx-datatables options") == 1
+    assert f"{broken_json}" in warnings
+    one_html = (tmp_path / "build/html/one.html").read_text(encoding="utf-8")
+    assert '"searching": false' in one_html
+
+    # touched but unchanged files are not parsed again, unlike invalid files
+    parsed.clear()
+    options_json.touch()
+    (basic_site / "one.rst").touch()
+    warnings = build()
+    assert parsed == ["{"]
+    assert warnings.count("Invalid sphinx-datatables options") == 1
+
+    parsed.clear()
+    options_json.write_text('{"paging": false}', encoding="utf-8")
+    build()
+    assert parsed.count('{"paging": false}') == 1
+
+
+DATA_SOURCES = {
+    "csv": 'name,size,note\nalpha,10,"<b>a, b</b>"\nbeta,20,\n',
+    "jsonl": (
+        '{"name": "alpha", "size": 10, "note": "<b>a, b</b>"}\n'
+        '{"name": "beta", "size": 20}\n'
+    ),
+}
+
+
+def load_gzip_data(page_html: str, html_dir: Path) -> list:
+    """Load the rows of a gzipped ``datatables-data`` file with node."""
+    page_js = page_html.split('<script class="sphinx-datatables-config">')[1]
+    script = textwrap.dedent(f"""
+        const fs = require("fs");
+        const path = require("path");
+        const options = [];
+        globalThis.document = {{
+            addEventListener: (_, handler) => setTimeout(handler),
+            querySelectorAll: () => [{{ matches: () => true }}],
+        }};
+        globalThis.DataTable = function (table, tableOptions) {{
+            tableOptions.ajax({{}}, (json) => console.log(JSON.stringify(json.data)));
+        }};
+        DataTable.isDataTable = () => false;
+        globalThis.fetch = async (url) =>
+            new Response(fs.readFileSync(path.join({json.dumps(f"{html_dir}")}, url)));
+    """)
+    script += page_js.split("</script>")[0]
+    result = subprocess.run(  # noqa: S603
+        ["node", "-e", script],  # noqa: S607
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+@pytest.mark.parametrize("use_gzip", [False, True])
+@pytest.mark.parametrize("data_format", ["csv", "jsonl"])
+def test_data_directive(
+    basic_site: Path, tmp_path: Path, data_format: str, use_gzip: bool
+) -> None:
+    """Test ``datatables-data`` streams a file into static data for the table."""
+    source = basic_site / f"data/inventory.{data_format}"
+    source.parent.mkdir()
+    source.write_text(DATA_SOURCES[data_format], encoding="utf-8")
+    (basic_site / "page.rst").write_text(
+        textwrap.dedent(f"""
+            :orphan:
+
+            .. datatables-data:: data/inventory.{data_format}
+                :columns: name, note
+                :name: inventory
+                {":gzip:" if use_gzip else ""}
+
+                {{"paging": false}}
+            """),
+        encoding="utf-8",
+    )
+    build = tmp_path / "build"
+
+    data_dir = build / "html/_static/datatables-data"
+
+    def build_page() -> tuple[str, list]:
+        app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+        app.build()
+        assert app.statuscode == 0
+        page_html = (build / "html/page.html").read_text(encoding="utf-8")
+        (data_file,) = data_dir.iterdir()
+        content = data_file.read_bytes()
+        data = json.loads(gzip.decompress(content) if use_gzip else content)
+        assert f"_static/datatables-data/{data_file.name}" in page_html
+        return page_html, data
+
+    page_html, data = build_page()
+    table = page_html.split('<table class="docutils align-default" id="inventory">')
+    header = table[1].split("</table>")[0]
+    assert "<tbody>\n</tbody>" in header
+    assert [cell.split("</p>")[0] for cell in header.split("<p>")[1:]] == [
+        "name",
+        "note",
+    ]
+    assert data == [["alpha", "&lt;b&gt;a, b&lt;/b&gt;"], ["beta", ""]]
+    assert "[`table#inventory`, 0]," in page_html
+    assert '"paging": false' in page_html
+    assert ("DecompressionStream" in page_html) is use_gzip
+    assert ('"dataSrc": ""' in page_html) is not use_gzip
+
+    if use_gzip and shutil.which("node"):
+        assert load_gzip_data(page_html, build / "html") == data
+
+    # the page is written again when the file changes
+    shutil.rmtree(data_dir)
+    source.write_text(
+        source.read_text(encoding="utf-8").replace("beta", "gamma"), encoding="utf-8"
+    )
+    _, data = build_page()
+    assert data[1] == ["gamma", ""]
+
+
+def test_data_source_digest(tmp_path: Path) -> None:
+    """Test a data file is hashed once for each way it is read."""
+    path = tmp_path / "data.csv"
+    path.write_text("name,size\nalpha,1\n", encoding="utf-8")
+    source = DataSource(path, "csv", ("name", "size"))
+    digest = source.digest
+    path.write_text("name,size\nbeta,2\n", encoding="utf-8")
+    assert source.digest == digest
+    assert dataclasses.replace(source, columns=("name",)).digest != digest
+    tmp_path.joinpath("static").mkdir()
+    assert source.write(tmp_path / "static") == f"data.{digest}.json"
+
+
+def test_data_directive_errors(basic_site: Path, tmp_path: Path) -> None:
+    """Test unknown columns and formats are reported at the directive."""
+    (basic_site / "data.csv").write_text("name\nalpha\n", encoding="utf-8")
+    (basic_site / "data.txt").write_text("name\nalpha\n", encoding="utf-8")
+    (basic_site / "page.rst").write_text(
+        textwrap.dedent("""
+            :orphan:
+
+            .. datatables-data:: data.csv
+                :columns: name, size
+
+            .. datatables-data:: data.txt
+            """),
+        encoding="utf-8",
+    )
+    warnings = StringIO()
+    app = SphinxTestApp(
+        "html",
+        SphinxTestPath(basic_site),
+        SphinxTestPath(tmp_path / "build"),
+        warning=warnings,
+    )
+    app.build()
+    assert "Unknown datatables data columns: size" in warnings.getvalue()
+    assert "Unknown datatables data format" in warnings.getvalue()
+
+
+def test_data_directive_latex(basic_site: Path, tmp_path: Path) -> None:
+    """Test a ``datatables-data`` table is written with only its header in LaTeX."""
+    (basic_site / "data.csv").write_text("name,quantity\nalpha,1\n", encoding="utf-8")
+    with (basic_site / "index.rst").open("a", encoding="utf-8") as index_rst:
+        index_rst.write("\n.. datatables-data:: data.csv\n")
+    build = tmp_path / "build"
+    app = SphinxTestApp("latex", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+    (tex,) = (build / "latex").glob("*.tex")
+    content = tex.read_text(encoding="utf-8")
+    assert "quantity" in content
+    assert "alpha" not in content
+
+
+def test_search_worker(basic_site: Path, tmp_path: Path) -> None:
+    """Test tables searched in a worker get a normalized corpus, and the worker."""
+    (basic_site / "data.csv").write_text("name\nGamma  Ray\n", encoding="utf-8")
+    (basic_site / "page.rst").write_text(
+        textwrap.dedent("""
+            :orphan:
+
+            .. list-table::
+                :header-rows: 1
+                :class: big
+
+                * - Name
+                  - Value
+                * - **Alpha**
+                  - One  Two
+                * - Beta
+                  - ``Three``
+
+            .. datatables-json:: table.big
+                :search-worker:
+
+            .. datatables-data:: data.csv
+                :name: data
+                :search-worker:
+            """),
+        encoding="utf-8",
+    )
+    build = tmp_path / "build"
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    html = build / "html"
+    page_html = (html / "page.html").read_text(encoding="utf-8")
+    corpora = {
+        json.loads(path.read_text(encoding="utf-8"))[0]: path.name
+        for path in (html / "_static/datatables-data").glob("search.*.json")
+    }
+    assert set(corpora) == {"alpha one two", "gamma ray"}
+    (worker_js,) = (html / "_static").glob("search_worker.*.js")
+    assert page_html.count("sphinxDatatables.withSearchWorker(") == 2  # noqa: PLR2004
+    assert f'"_static/{worker_js.name}", {{"id1": ' in page_html
+    assert f'"data": "_static/datatables-data/{corpora["gamma ray"]}"' in page_html
+
+    if shutil.which("node") is None:  # pragma: no cover
+        return
+
+    # only the latest of several queries in a row is answered, and a corpus which
+    # cannot be fetched is reported
+    script = textwrap.dedent("""
+        const posted = [];
+        globalThis.postMessage = (message) => posted.push(message);
+        globalThis.fetch = async (url) => ({
+            ok: url === "search.json",
+            status: 404,
+            statusText: "Not Found",
+            json: async () => ["alpha one two", "beta three", "alpha beta"],
+        });
+    """)
+    script += worker_js.read_text(encoding="utf-8")
+    script += textwrap.dedent("""
+        onmessage({ data: { corpus: "search.json" } });
+        onmessage({ data: { id: 1, query: "alpha" } });
+        onmessage({ data: { id: 2, query: "ALPHA   beta" } });
+        onmessage({ data: { id: 3, query: "" } });
+        onmessage({ data: { id: 4, query: "beta" } });
+        setTimeout(() => {
+            onmessage({ data: { corpus: "missing.json" } });
+            setTimeout(() => console.log(JSON.stringify(posted)), 10);
+        }, 10);
+    """)
+    result = subprocess.run(  # noqa: S603
+        ["node", "-e", script],  # noqa: S607
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert json.loads(result.stdout) == [
+        {"ready": True},
+        {"id": 4, "rows": [1, 2]},
+        {"error": "Error: 404 Not Found"},
+    ]
+
+
+SEARCH_STUBS = """
+globalThis.window = globalThis;
+globalThis.document = { baseURI: "https://example.com/docs/page.html" };
+const log = { off: [], posted: [], draws: 0, terminated: 0, search: "gam" };
+let onInput;
+globalThis.Worker = class {
+    constructor(url) {
+        log.worker = url;
+        globalThis.worker = this;
+    }
+    postMessage(message) {
+        log.posted.push(message);
+    }
+    terminate() {
+        log.terminated += 1;
+    }
+};
+const input = {
+    off: (namespace) => log.off.push(namespace) && input,
+    on: (_, handler) => {
+        onInput = handler;
+        return input;
+    },
+};
+globalThis.$ = () => ({ find: () => input });
+$.fn = { dataTable: { ext: { search: [] } } };
+$.fn.dataTable.Api = function () {
+    const api = {
+        table: () => api,
+        container: () => ({}),
+        draw: () => {
+            log.draws += 1;
+        },
+        search: (value) => {
+            if (value === undefined) {
+                return log.search;
+            }
+            log.search = value;
+            return api;
+        },
+    };
+    return api;
+};
+"""
+
+
+def test_search_worker_page() -> None:
+    """Test the page filters rows by the latest query, once the worker is ready."""
+    if shutil.which("node") is None:  # pragma: no cover
+        return
+
+    wait = SEARCH_DEBOUNCE_MS * 2
+    script = NL.join(
+        [
+            SEARCH_STUBS,
+            get_template("search_datatables.js.in").render(debounce=SEARCH_DEBOUNCE_MS),
+            textwrap.dedent(f"""
+                const settings = {{ nTable: {{ id: "t1" }} }};
+                const options = sphinxDatatables.withSearchWorker(
+                    {{ initComplete: () => {{ log.initComplete = true; }} }},
+                    "worker.js",
+                    {{ t1: "data/search.json" }},
+                );
+                options.initComplete.call({{}}, settings, {{}});
+                const filter = $.fn.dataTable.ext.search[0];
+                const shown = (s) => [0, 1, 2, 3].filter((i) => filter(s, [], i));
+                const sleep = (ms) => new Promise((r) => setTimeout(r, ms));
+                (async () => {{
+                    // DataTables' search is only replaced once the worker is ready,
+                    // which then searches what was already typed
+                    log.loading = log.off.length;
+                    worker.onmessage({{ data: {{ ready: true }} }});
+                    // typing is debounced into a single query
+                    onInput.call({{ value: "al" }});
+                    onInput.call({{ value: "alpha" }});
+                    await sleep({wait});
+                    onInput.call({{ value: "beta" }});
+                    await sleep({wait});
+                    log.before = shown(settings);
+                    // the results of a stale query are dropped
+                    worker.onmessage({{ data: {{ id: 2, rows: [0] }} }});
+                    log.stale = shown(settings);
+                    worker.onmessage({{ data: {{ id: 3, rows: [1, 2] }} }});
+                    log.latest = shown(settings);
+                    log.other = shown({{}});
+                    worker.onmessage({{ data: {{ id: 3, rows: null }} }});
+                    log.cleared = shown(settings);
+                    // a table whose corpus cannot be loaded keeps its own search
+                    const failed = {{ nTable: {{ id: "t2" }} }};
+                    sphinxDatatables.searchWorker(failed, "worker.js", "search.json");
+                    worker.onmessage({{ data: {{ error: "Error: 404" }} }});
+                    log.filters = $.fn.dataTable.ext.search.length;
+                    console.log(JSON.stringify(log));
+                }})();
+            """),
+        ]
+    )
+    result = subprocess.run(  # noqa: S603
+        ["node", "-e", script],  # noqa: S607
+        capture_output=True,
+        check=True,
+        text=True,
     )
+    assert json.loads(result.stdout) == {
+        "worker": "worker.js",
+        "initComplete": True,
+        "off": [".DT"],
+        "loading": 0,
+        "search": "",
+        "terminated": 1,
+        "filters": 1,
+        "posted": [
+            {"corpus": "https://example.com/docs/data/search.json"},
+            {"id": 1, "query": "gam"},
+            {"id": 2, "query": "alpha"},
+            {"id": 3, "query": "beta"},
+            {"corpus": "https://example.com/docs/search.json"},
+        ],
+        "draws": 2,
+        "before": [0, 1, 2, 3],
+        "stale": [0, 1, 2, 3],
+        "latest": [1, 2],
+        "other": [0, 1, 2, 3],
+        "cleared": [0, 1, 2, 3],
+    }
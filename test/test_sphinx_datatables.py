@@ -4,17 +4,31 @@
 
 """Tests suite for sphinx-datatables."""
 
+import gzip
+import json
+import re
+import shutil
+import subprocess
+import sys
 import textwrap
+from io import StringIO
 from pathlib import Path
 from typing import Any
 
 import pytest
+import sphinx
+from sphinx.errors import ExtensionError
 from sphinx.testing.util import SphinxTestApp
 
 from sphinx_datatables.config import SphinxDatatablesConfig
-from sphinx_datatables.js import create_datatables_js
+from sphinx_datatables.js import (
+    _render_datatables_js,
+    create_datatables_js,
+    create_page_js,
+    get_template,
+)
 
-from .conftest import SphinxTestPath
+from .conftest import SphinxTestPath, append_conf
 
 
 @pytest.mark.parametrize(
@@ -27,17 +41,22 @@ from .conftest import SphinxTestPath
                 //
                 // SPDX-License-Identifier: MIT
 
-                $(document).ready( function () {
-                    $.extend( $.fn.dataTable.defaults,
+                document.addEventListener("DOMContentLoaded", function () {
+                    Object.assign( DataTable.defaults,
                         {
                             "paging": true,
                             "searching": false
                         },
                     );
 
-                    $(`table.sphinx-datatable`).filter(':not(.dataTable)').DataTable(
-                        {},
+                    const tables = document.querySelectorAll(
+                        `table.sphinx-datatable:not(.sphinx-datatables-own-options)`
                     );
+                    tables.forEach( function (table) {
+                        if (!DataTable.isDataTable(table)) {
+                            new DataTable(table, {});
+                        }
+                    } );
                 } );"""),
         ),
         (
@@ -47,17 +66,22 @@ from .conftest import SphinxTestPath
                 //
                 // SPDX-License-Identifier: MIT
 
-                $(document).ready( function () {
-                    $.extend( $.fn.dataTable.defaults,
+                document.addEventListener("DOMContentLoaded", function () {
+                    Object.assign( DataTable.defaults,
                         {
                             "paging": true,
                             "searching": false
                         },
                     );
 
-                    $(`table.sphinx-datatable`).filter(':not(.dataTable)').DataTable(
-                        {},
+                    const tables = document.querySelectorAll(
+                        `table.sphinx-datatable:not(.sphinx-datatables-own-options)`
                     );
+                    tables.forEach( function (table) {
+                        if (!DataTable.isDataTable(table)) {
+                            new DataTable(table, {});
+                        }
+                    } );
                 } );"""),
         ),
         (
@@ -67,14 +91,19 @@ from .conftest import SphinxTestPath
                 //
                 // SPDX-License-Identifier: MIT
 
-                $(document).ready( function () {
-                    $.extend( $.fn.dataTable.defaults,
+                document.addEventListener("DOMContentLoaded", function () {
+                    Object.assign( DataTable.defaults,
                         {},
                     );
 
-                    $(`table.another-datatable`).filter(':not(.dataTable)').DataTable(
-                        {},
+                    const tables = document.querySelectorAll(
+                        `table.another-datatable:not(.sphinx-datatables-own-options)`
                     );
+                    tables.forEach( function (table) {
+                        if (!DataTable.isDataTable(table)) {
+                            new DataTable(table, {});
+                        }
+                    } );
                 } );"""),
         ),
         (
@@ -85,7 +114,7 @@ from .conftest import SphinxTestPath
                     "language": {"lengthLabels": {"-1": "Show all"}},
                     "lengthMenu": [10, 25, 50, -1],
                 },
-                "2.3.5",
+                "1.13.8",
             ),
             textwrap.dedent("""
                 // Copyright (c) 2023 Varun Sharma
@@ -110,16 +139,16 @@ from .conftest import SphinxTestPath
                         },
                     );
 
-                    $(`table.sphinx-datatable`).filter(':not(.dataTable)').DataTable(
-                        {},
-                    );
+                    $(`table.sphinx-datatable:not(.sphinx-datatables-own-options)`)
+                        .filter(':not(.dataTable)')
+                        .DataTable({});
                 } );"""),
         ),
         (
             (
                 "sphinx-datatable",
                 {"scrollY": 300, "paging": False},
-                "2.3.5",
+                "1.13.8",
             ),
             textwrap.dedent("""
                 // Copyright (c) 2023 Varun Sharma
@@ -134,9 +163,9 @@ from .conftest import SphinxTestPath
                         },
                     );
 
-                    $(`table.sphinx-datatable`).filter(':not(.dataTable)').DataTable(
-                        {},
-                    );
+                    $(`table.sphinx-datatable:not(.sphinx-datatables-own-options)`)
+                        .filter(':not(.dataTable)')
+                        .DataTable({});
                 } );"""),
         ),
     ],
@@ -180,11 +209,7 @@ def test_custom_js_css(
         conf_lines += [f"datatables_css = '{test_css.name}'"]
 
     if conf_lines:
-        conf_py = basic_site / "conf.py"
-        conf_py.write_text(
-            "\n".join([conf_py.read_text(encoding="utf-8"), *conf_lines]),
-            encoding="utf-8",
-        )
+        append_conf(basic_site, *conf_lines)
 
     app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
     app.build()
@@ -200,3 +225,627 @@ def test_custom_js_css(
 
     if add_js and add_css:
         assert "cdn.datatables.net" not in index_html
+
+
+def test_create_datatables_js_cached() -> None:
+    """Test that equivalent configurations reuse a single rendered script."""
+    _render_datatables_js.cache_clear()
+    configs = [
+        SphinxDatatablesConfig(
+            datatables_class="sphinx-datatable",
+            datatables_options={"paging": False},
+            datatables_version="2.3.5",
+        )
+        for _ in range(3)
+    ]
+    results = {create_datatables_js(config) for config in configs}
+    assert len(results) == 1
+    assert _render_datatables_js.cache_info().hits == len(configs) - 1
+    assert get_template() is get_template()
+
+
+@pytest.mark.parametrize("all_pages", [False, True])
+def test_assets_only_on_table_pages(
+    tmp_path: Path,
+    basic_site: Path,
+    all_pages: bool,
+) -> None:
+    """Test assets are only added to pages with tables, unless opted out."""
+    build = tmp_path / "build"
+    (basic_site / "plain.rst").write_text(
+        ":orphan:\n\nplain\n=====\n\nNo tables here.\n",
+        encoding="utf-8",
+    )
+    if all_pages:
+        append_conf(basic_site, "datatables_all_pages = True")
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    index_html = (build / "html/index.html").read_text(encoding="utf-8")
+    plain_html = (build / "html/plain.html").read_text(encoding="utf-8")
+    assert "activate_datatables." in index_html
+    assert "cdn.datatables.net" in index_html
+    assert ("activate_datatables." in plain_html) is all_pages
+    assert ("cdn.datatables.net" in plain_html) is all_pages
+
+
+def test_single_html(tmp_path: Path, basic_site: Path) -> None:
+    """Test the single page of ``singlehtml`` gets the assets of any document."""
+    build = tmp_path / "build"
+    index_rst = basic_site / "index.rst"
+    (basic_site / "sub.rst").write_text(
+        index_rst.read_text(encoding="utf-8"), encoding="utf-8"
+    )
+    index_rst.write_text("index\n=====\n\n.. toctree::\n\n    sub\n", encoding="utf-8")
+
+    app = SphinxTestApp("singlehtml", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    index_html = (build / "singlehtml/index.html").read_text(encoding="utf-8")
+    assert "activate_datatables." in index_html
+    assert "cdn.datatables.net" in index_html
+
+
+def test_class_changed(tmp_path: Path, basic_site: Path) -> None:
+    """Test documents are read again once ``datatables_class`` changes."""
+    build = tmp_path / "build"
+    index_rst = basic_site / "index.rst"
+    index_rst.write_text(
+        index_rst.read_text(encoding="utf-8").replace("sphinx-datatable", "other"),
+        encoding="utf-8",
+    )
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    index_html = (build / "html/index.html").read_text(encoding="utf-8")
+    assert "activate_datatables." not in index_html
+
+    append_conf(basic_site, "datatables_class = 'other'")
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+    index_html = (build / "html/index.html").read_text(encoding="utf-8")
+    assert "activate_datatables." in index_html
+
+
+@pytest.mark.parametrize(
+    ("version", "expected_js"),
+    [
+        ("1.13.8", "https://cdn.datatables.net/1.13.8/js/jquery.dataTables.min.js"),
+        ("2.3.5", "https://cdn.datatables.net/v/dt/dt-2.3.5/datatables.min.js"),
+    ],
+)
+def test_assets_resolved_once(
+    tmp_path: Path, basic_site: Path, version: str, expected_js: str
+) -> None:
+    """Test the configuration and assets are resolved when the builder starts."""
+    append_conf(basic_site, f"datatables_version = '{version}'")
+    build = tmp_path / "build"
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    assert app.env.datatables_config.datatables_version == version
+    assert app.env.datatables_assets.datatables_js == expected_js
+    app.build()
+    assert app.statuscode == 0
+    index_html = (build / "html/index.html").read_text(encoding="utf-8")
+    assert expected_js in index_html
+
+
+def test_invalid_version(tmp_path: Path, basic_site: Path) -> None:
+    """Test an invalid DataTables version is reported when the builder starts."""
+    append_conf(basic_site, "datatables_version = 'latest'")
+    build = tmp_path / "build"
+    with pytest.raises(ExtensionError, match="Invalid datatables_version"):
+        SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+
+
+@pytest.mark.parametrize("key", ["'nope'", "'os.path:nope'", "'os:sep'"])
+def test_invalid_keys(tmp_path: Path, basic_site: Path, key: str) -> None:
+    """Test unknown and unimportable keys are reported when the builder starts."""
+    append_conf(basic_site, f"datatables_sort_keys = {{0: {key}}}")
+    build = tmp_path / "build"
+    with pytest.raises(ExtensionError, match="sphinx-datatables key"):
+        SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+
+
+@pytest.mark.parametrize("missing", [False, True])
+def test_vendored_assets(
+    tmp_path: Path,
+    basic_site: Path,
+    missing: bool,
+) -> None:
+    """Test vendored assets are copied under content-hashed names."""
+    build = tmp_path / "build"
+    vendor = basic_site / "vendor"
+    vendor.mkdir()
+    (vendor / "datatables.min.js").write_text("/* js */", encoding="utf-8")
+    if not missing:
+        (vendor / "datatables.min.css").write_text("/* css */", encoding="utf-8")
+    append_conf(basic_site, "datatables_vendor_dir = 'vendor'")
+
+    if missing:
+        with pytest.raises(ExtensionError, match=r"datatables\.min\.css"):
+            SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+        return
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    index_html = (build / "html/index.html").read_text(encoding="utf-8")
+    assert "cdn.datatables.net" not in index_html
+    for name, suffix in [("js", ".min.js"), ("css", ".min.css")]:
+        (vendored,) = (build / "html/_static").glob(f"datatables.*{suffix}")
+        assert vendored.read_text(encoding="utf-8") == f"/* {name} */"
+        assert vendored.name != f"datatables{suffix}"
+        assert f"_static/{vendored.name}" in index_html
+
+
+def test_preload_vendored(tmp_path: Path, basic_site: Path) -> None:
+    """Test vendored assets are preloaded from the URLs their tags load."""
+    build = tmp_path / "build"
+    vendor = basic_site / "vendor"
+    vendor.mkdir()
+    (vendor / "datatables.min.js").write_text("/* js */", encoding="utf-8")
+    (vendor / "datatables.min.css").write_text("/* css */", encoding="utf-8")
+    append_conf(
+        basic_site, "datatables_vendor_dir = 'vendor'", "datatables_preload = True"
+    )
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+    # once the files exist, Sphinx adds their checksums, cached for each process
+    subprocess.run(  # noqa: S603
+        [
+            *(sys.executable, "-m", "sphinx", "-a", "-q"),
+            *(f"{basic_site}", f"{build / 'html'}", "-d", f"{build / 'doctrees'}"),
+        ],
+        check=True,
+    )
+
+    index_html = (build / "html/index.html").read_text(encoding="utf-8")
+    for kind, tag in [("script", '<script src="{}"'), ("style", 'href="{}"')]:
+        (href,) = re.findall(
+            rf'<link rel="preload" href="([^"]+)" as="{kind}">', index_html
+        )
+        assert ("?v=" in href) is (sphinx.version_info >= (7, 1))
+        assert tag.format(href) in index_html
+
+
+def test_activate_js_hashed(tmp_path: Path, basic_site: Path) -> None:
+    """Test the activation script is content-hashed and only written on change."""
+    build = tmp_path / "build"
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    activate_js = app.env.datatables_assets.activate_js
+    assert activate_js.startswith("activate_datatables.")
+    assert activate_js != "activate_datatables.js"
+    asset_file = build / "html/_static" / activate_js
+    assert asset_file.read_text(encoding="utf-8") == create_datatables_js(
+        app.env.datatables_config
+    )
+    index_html = (build / "html/index.html").read_text(encoding="utf-8")
+    assert f"_static/{activate_js}" in index_html
+
+    mtime = asset_file.stat().st_mtime_ns
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build(force_all=True)
+    assert app.env.datatables_assets.activate_js == activate_js
+    assert asset_file.stat().st_mtime_ns == mtime
+
+
+def test_parallel_registry(tmp_path: Path, basic_site: Path) -> None:
+    """Test a parallel build records the same pages, and output, as a serial one."""
+    for index in range(8):
+        rows = "".join(f"\n    * - {row}\n      - {index}" for row in range(index))
+        directive = (
+            f"\n\n.. datatables-json:: table.custom-{index}\n\n    {{}}"
+            if index % 2
+            else ""
+        )
+        (basic_site / f"page{index}.rst").write_text(
+            f":orphan:\n\npage\n====\n\n.. list-table::\n    :class: custom-{index}\n"
+            f"{rows}{directive}\n",
+            encoding="utf-8",
+        )
+
+    builds = {}
+    for parallel in (0, 4):
+        build = tmp_path / f"build-{parallel}"
+        app = SphinxTestApp(
+            "html",
+            SphinxTestPath(basic_site),
+            SphinxTestPath(build),
+            parallel=parallel,
+        )
+        app.build()
+        assert app.statuscode == 0
+        builds[parallel] = (
+            app.env.datatables_pages,
+            {
+                path.relative_to(build): path.read_bytes()
+                for path in (build / "html").glob("*.html")
+            },
+        )
+
+    pages, html = builds[4]
+    assert builds[0] == (pages, html)
+    assert sorted(pages) == ["index", "page1", "page3", "page5", "page7"]
+    assert [table.rows for table in pages["page7"].tables] == [7]
+    assert pages["page7"].directives[0].selector == "table.custom-7"
+
+
+def test_build_report(tmp_path: Path, basic_site: Path) -> None:
+    """Test the build report records times and sizes for each page."""
+    append_conf(basic_site, "datatables_report = True")
+    (basic_site / "page.rst").write_text(
+        ":orphan:\n\n.. datatables-json:: table.other\n\n    {}\n",
+        encoding="utf-8",
+    )
+    build = tmp_path / "build"
+    status = StringIO()
+    app = SphinxTestApp(
+        "html", SphinxTestPath(basic_site), SphinxTestPath(build), status=status
+    )
+    app.build()
+    assert app.statuscode == 0
+    assert "sphinx-datatables report:" in status.getvalue()
+
+    report = json.loads((build / "html/datatables-report.json").read_text("utf-8"))
+    assert report["calls"]["finish"] == 1
+    assert report["calls"]["create_datatables_js"] == 1
+    assert report["calls"]["directive run"] == 1
+    assert report["calls"]["add_datatables_scripts"] >= len(report["pages"])
+    index = report["pages"]["index"]
+    assert (index["tables"], index["rows"], index["inline_script_bytes"]) == (1, 1, 0)
+    page = report["pages"]["page"]
+    assert page["inline_script_bytes"] > 0
+    assert page["seconds"]["directive run"] > 0
+
+
+def test_lazy(tmp_path: Path, basic_site: Path) -> None:
+    """Test tables are initialized lazily, globally or for each directive."""
+    append_conf(basic_site, "datatables_lazy = 'visible'")
+    (basic_site / "page.rst").write_text(
+        ":orphan:\n\n.. datatables-json:: table.other\n    :lazy: idle\n\n    {}\n",
+        encoding="utf-8",
+    )
+    build = tmp_path / "build"
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    html = build / "html"
+    page_html = (html / "page.html").read_text(encoding="utf-8")
+    assert '[`table.other`, 0, "idle"],' in page_html
+    # defined once, in the activation script
+    assert "sphinxDatatables.initTable = " not in page_html
+    (activate_js,) = (html / "_static").glob("activate_datatables.*.js")
+    activate = activate_js.read_text(encoding="utf-8")
+    assert 'sphinxDatatables.initTable(table, {}, "visible");' in activate
+
+    if shutil.which("node") is None:  # pragma: no cover
+        return
+
+    script = textwrap.dedent("""
+        globalThis.window = globalThis;
+        globalThis.document = { addEventListener() {} };
+        const observers = [];
+        const idle = [];
+        globalThis.IntersectionObserver = class {
+            constructor(callback) { observers.push(callback); }
+            observe() {}
+            disconnect() {}
+        };
+        globalThis.requestIdleCallback = (callback) => idle.push(callback);
+        globalThis.DataTable = function (table) {
+            table.initialized = true;
+            this.table = () => ({ container: () => ({ style: {} }) });
+        };
+        DataTable.isDataTable = (table) => !!table.initialized;
+        const newTable = () => ({
+            offsetHeight: 100,
+            getBoundingClientRect: () => ({ bottom: 100 }),
+        });
+    """)
+    script += activate + textwrap.dedent("""
+        const visible = newTable();
+        const idleTable = newTable();
+        const eager = newTable();
+        sphinxDatatables.initTable(visible, {}, "visible");
+        sphinxDatatables.initTable(idleTable, {}, "idle");
+        sphinxDatatables.initTable(eager, {}, "off");
+        const before = [visible, idleTable, eager].map((t) => !!t.initialized);
+        observers[0]([{ isIntersecting: true }]);
+        idle[0]();
+        const after = [visible, idleTable, eager].map((t) => !!t.initialized);
+        console.log(JSON.stringify([before, after]));
+    """)
+    result = subprocess.run(  # noqa: S603
+        ["node", "-e", script],  # noqa: S607
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert json.loads(result.stdout) == [[False, False, True], [True, True, True]]
+
+
+def test_deferred_scripts(tmp_path: Path, basic_site: Path) -> None:
+    """Test deferred scripts and resource hints, with tables initialized in order."""
+    vendor = basic_site / "vendor"
+    vendor.mkdir()
+    (vendor / "datatables.min.css").write_text(".dt {}", encoding="utf-8")
+    append_conf(
+        basic_site,
+        "datatables_options = {'paging': False}",
+        "datatables_js = 'https://cdn.datatables.net/x/datatables.min.js'",
+        "datatables_vendor_dir = 'vendor'",
+        "datatables_defer = True",
+        "datatables_preload = True",
+        "datatables_inline_css = True",
+    )
+    (basic_site / "page.rst").write_text(
+        ':orphan:\n\n.. datatables-json:: table.other\n\n    {"searching": false}\n',
+        encoding="utf-8",
+    )
+    build = tmp_path / "build"
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    html = build / "html"
+    page_html = (html / "page.html").read_text(encoding="utf-8")
+    head = page_html.split("</head>")[0]
+    assert '<link rel="preconnect" href="https://cdn.datatables.net">' in head
+    assert '<link rel="dns-prefetch" href="https://cdn.datatables.net">' in head
+    assert (
+        '<link rel="preload" href="https://cdn.datatables.net/x/datatables.min.js"'
+        ' as="script">'
+    ) in head
+    # the CSS is inlined, so it is neither linked nor preloaded
+    assert '<style class="sphinx-datatables-css">.dt {}</style>' in head
+    assert "datatables.min.css" not in page_html
+    assert 'defer="defer" src="https://cdn.datatables.net/x/' in head
+    (activate_js,) = (html / "_static").glob("activate_datatables.*.js")
+    assert f'defer="defer" src="_static/{activate_js.name}"' in head
+    # only the pages with tables are given hints
+    assert "preconnect" not in (html / "genindex.html").read_text(encoding="utf-8")
+
+    if shutil.which("node") is None:  # pragma: no cover
+        return
+
+    page_js = page_html.split('<script class="sphinx-datatables-config">')[1]
+    script = textwrap.dedent("""
+        globalThis.window = globalThis;
+        const handlers = [];
+        const initialized = [];
+        const tables = { sphinx: {}, other: {} };
+        globalThis.document = {
+            addEventListener: (_, handler) => handlers.push(handler),
+            querySelectorAll: (selector) =>
+                [selector.includes("other") ? tables.other : tables.sphinx],
+        };
+        tables.other.matches = () => true;
+        globalThis.DataTable = function (table, options) {
+            table.initialized = true;
+            initialized.push({ ...DataTable.defaults, ...options });
+        };
+        DataTable.defaults = {};
+        DataTable.isDataTable = (table) => !!table.initialized;
+    """)
+    # the inline script runs while parsing, before the deferred scripts
+    script += page_js.split("</script>")[0]
+    script += activate_js.read_text(encoding="utf-8")
+    script += textwrap.dedent("""
+        handlers.forEach((handler) => handler());
+        console.log(JSON.stringify(initialized));
+    """)
+    result = subprocess.run(  # noqa: S603
+        ["node", "-e", script],  # noqa: S607
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert json.loads(result.stdout) == [
+        {"paging": False},
+        {"paging": False, "searching": False},
+    ]
+
+
+MINIFY_STUBS = """
+globalThis.window = globalThis;
+const handlers = [];
+const idle = [];
+const initialized = [];
+const tables = ["table.sphinx-datatable", "table.other", "table.idle"].map(
+    (selector) => ({ selector, offsetHeight: 0, getBoundingClientRect: () => ({}) })
+);
+const select = (selectors) =>
+    tables.filter((table) =>
+        selectors.split(", ").some((s) => s.split(":not")[0] === table.selector)
+    );
+function init(table, options) {
+    table.initialized = true;
+    initialized.push([table.selector, options]);
+    const api = { table: () => api, container: () => ({ style: {} }) };
+    return api;
+}
+globalThis.requestIdleCallback = (callback) => idle.push(callback);
+globalThis.document = {
+    addEventListener: (_, handler) => handlers.push(handler),
+    querySelectorAll: select,
+};
+tables.forEach((table) => { table.matches = (s) => s === table.selector; });
+globalThis.DataTable = function (table, options) {
+    return init(table, { ...DataTable.defaults, ...options });
+};
+DataTable.defaults = {};
+DataTable.isDataTable = (table) => !!table.initialized;
+const wrap = (elements) => ({
+    ready: (handler) => handlers.push(handler),
+    filter: () => wrap(elements.filter((table) => !table.initialized)),
+    each: (callback) => elements.forEach((table) => callback.call(table)),
+    is: (selector) => elements.every((table) => table.selector === selector),
+    hasClass: () => elements.every((table) => table.initialized),
+    DataTable: (options) => elements.map(
+        (table) => init(table, { ...$.fn.dataTable.defaults, ...options })
+    )[0],
+});
+globalThis.$ = (arg) =>
+    typeof arg === "string" ? wrap(select(arg)) : wrap(arg === document ? [] : [arg]);
+$.extend = Object.assign;
+$.fn = { dataTable: { defaults: {} } };
+"""
+
+
+@pytest.mark.parametrize("version", ["1.13.8", "2.3.5"])
+@pytest.mark.parametrize("lazy", ["off", "idle"])
+def test_minify(version: str, lazy: str) -> None:
+    """Test minified scripts are smaller, and initialize tables identically."""
+    page_tables = [
+        ("table.other", {"searching": False, "order": [[1, "desc"]]}, "", "", {}),
+        ("table.idle", {"paging": False}, "", "idle", {}),
+    ]
+    outputs = []
+    for minify in (False, True):
+        config = SphinxDatatablesConfig(
+            datatables_version=version,
+            datatables_class="sphinx-datatable",
+            datatables_options={"pageLength": 25, "language": {"search": "Find:"}},
+            datatables_lazy=lazy,
+            datatables_minify=minify,
+        )
+        activate = create_datatables_js(config)
+        page = create_page_js(config, page_tables)
+        outputs.append((activate, page))
+        if minify:
+            assert "//" not in activate
+            assert '{"searching":false,"order":[[1,"desc"]]},' in page
+    (readable, minified) = outputs
+    assert len("".join(minified)) < len("".join(readable))
+
+    if shutil.which("node") is None:  # pragma: no cover
+        return
+
+    results = []
+    for activate, page in outputs:
+        page_js = page.removeprefix('<script class="sphinx-datatables-config">')
+        script = MINIFY_STUBS + activate + page_js.removesuffix("</script>")
+        script += textwrap.dedent("""
+            handlers.forEach((handler) => handler());
+            idle.forEach((callback) => callback());
+            console.log(JSON.stringify(initialized));
+        """)
+        result = subprocess.run(  # noqa: S603
+            ["node", "-e", script],  # noqa: S607
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        results.append(json.loads(result.stdout))
+    assert results[0] == results[1]
+    assert [selector for selector, _ in results[0]] == [
+        "table.sphinx-datatable",
+        "table.other",
+        "table.idle",
+    ]
+
+
+def test_precompress(tmp_path: Path, basic_site: Path) -> None:
+    """Test compressed siblings are written for the static files, once."""
+    append_conf(
+        basic_site,
+        "datatables_precompress = ['gzip']",
+    )
+    (basic_site / "data.csv").write_text(
+        "name,value\n" + "".join(f"row {i},{i}\n" for i in range(100)),
+        encoding="utf-8",
+    )
+    (basic_site / "page.rst").write_text(
+        ":orphan:\n\n.. datatables-data:: data.csv\n",
+        encoding="utf-8",
+    )
+    build = tmp_path / "build"
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    static = build / "html/_static"
+    (activate_js,) = static.glob("activate_datatables.*.js")
+    (data_json,) = static.glob("datatables-data/data.*.json")
+    siblings = []
+    for path in (activate_js, data_json):
+        sibling = path.with_name(f"{path.name}.gz")
+        assert gzip.decompress(sibling.read_bytes()) == path.read_bytes()
+        siblings.append(sibling)
+
+    # unchanged files are not compressed again
+    mtimes = [sibling.stat().st_mtime_ns for sibling in siblings]
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert [sibling.stat().st_mtime_ns for sibling in siblings] == mtimes
+
+
+def test_invalid_precompress(tmp_path: Path, basic_site: Path) -> None:
+    """Test an unknown encoding is reported when the builder starts."""
+    append_conf(basic_site, "datatables_precompress = ['zip']")
+    build = tmp_path / "build"
+    with pytest.raises(ExtensionError, match="Invalid datatables_precompress"):
+        SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+
+
+#: Modules which are only imported when the extension first needs them
+DEFERRED_MODULES = (
+    "jinja2",
+    "packaging.version",
+    "tomllib",
+    "tomli",
+    "textwrap",
+    "gzip",
+    "concurrent.futures",
+    "brotli",
+    "sphinx.util.console",
+)
+
+#: The most time importing the extension may take, in microseconds
+IMPORT_BUDGET_US = 100_000
+
+
+def test_import_time() -> None:
+    """Test importing the extension is cheap, with heavy imports deferred."""
+    # block the deferred modules, so importing any of them fails
+    script = textwrap.dedent(f"""
+        import sys
+        import sphinx.application, sphinx.environment, sphinx.util.docutils
+        for name in {DEFERRED_MODULES!r}:
+            sys.modules[name] = None
+        import sphinx_datatables
+    """)
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    (line,) = (
+        line
+        for line in result.stderr.splitlines()
+        if line.endswith("| sphinx_datatables")
+    )
+    cumulative = int(line.split("|")[1])
+    assert cumulative < IMPORT_BUDGET_US
+
+
+def test_other_builders(tmp_path: Path, basic_site: Path) -> None:
+    """Test builders for other formats don't write any static files."""
+    build = tmp_path / "build"
+    app = SphinxTestApp("text", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+    assert app.env.datatables_assets is None
+    assert not list(build.rglob("*datatables*"))
@@ -0,0 +1,527 @@
+# Copyright (c) 2026 Varun Sharma
+#
+# SPDX-License-Identifier: MIT
+
+"""Build-time table processing tests for sphinx-datatables."""
+
+import contextlib
+import functools
+import http.server
+import json
+import shutil
+import subprocess
+import textwrap
+import threading
+import urllib.request
+from collections.abc import Iterator
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from docutils import nodes
+from sphinx.testing.util import SphinxTestApp
+
+from sphinx_datatables.keys import KEY_FUNCTIONS
+from sphinx_datatables.tables import column_order, column_type
+
+from .conftest import SphinxTestPath, append_conf
+
+NL = "\n"
+
+MIN_ROWS = 3
+LARGE_CELLS = 8
+
+
+@contextlib.contextmanager
+def serve(directory: Path) -> Iterator[str]:
+    """Serve a directory with a plain static file server, yielding its URL."""
+    handler = functools.partial(
+        http.server.SimpleHTTPRequestHandler, directory=f"{directory}"
+    )
+    with http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{server.server_address[1]}"
+        finally:
+            server.shutdown()
+
+
+def write_list_table(path: Path, rows: list[tuple[str, str]]) -> None:
+    """Write a page with a two-column ``list-table`` with the given body rows."""
+    body = "".join(f"{NL}    * - {a}{NL}      - {b}" for a, b in rows)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        textwrap.dedent("""
+            :orphan:
+
+            page
+            ====
+
+            .. list-table:: Title
+                :header-rows: 1
+                :class: sphinx-datatable
+
+                * - Name
+                  - Value""").strip()
+        + body,
+        encoding="utf-8",
+    )
+
+
+@pytest.mark.parametrize("threshold", [0, 2, 3])
+def test_external_data(tmp_path: Path, basic_site: Path, threshold: int) -> None:
+    """Test body rows of large tables are moved into an external JSON file."""
+    build = tmp_path / "build"
+    rows = [("alpha", "**bold**"), ("beta", "1 < 2"), ("gamma", "plain")]
+    write_list_table(basic_site / "sub/page.rst", rows)
+    append_conf(basic_site, f"datatables_external_data_threshold = {threshold}")
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    page_html = (build / "html/sub/page.html").read_text(encoding="utf-8")
+    data_files = list((build / "html/_static/datatables-data").glob("*.json"))
+    extracted = 0 < threshold < len(rows)
+    assert ("alpha" not in page_html) is extracted
+    assert len(data_files) == int(extracted)
+    if not extracted:
+        return
+
+    data = json.loads(data_files[0].read_text(encoding="utf-8"))
+    assert data == [
+        ["alpha", "<strong>bold</strong>"],
+        ["beta", "1 &lt; 2"],
+        ["gamma", "plain"],
+    ]
+    assert f'"url": "../_static/datatables-data/{data_files[0].name}"' in page_html
+    assert '"deferRender": true' in page_html
+
+
+def test_images_not_extracted(tmp_path: Path, basic_site: Path) -> None:
+    """Test tables with images stay in the page, where their URLs are resolved."""
+    build = tmp_path / "build"
+    (basic_site / "sub").mkdir()
+    (basic_site / "sub/icon.png").write_bytes(b"")
+    rows = [("alpha", "|icon|"), ("beta", "x"), ("gamma", "y")]
+    write_list_table(basic_site / "sub/page.rst", rows)
+    page_rst = basic_site / "sub/page.rst"
+    page_rst.write_text(
+        page_rst.read_text(encoding="utf-8") + f"{NL * 2}.. |icon| image:: icon.png",
+        encoding="utf-8",
+    )
+    append_conf(basic_site, "datatables_external_data_threshold = 1")
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    page_html = (build / "html/sub/page.html").read_text(encoding="utf-8")
+    assert 'src="../_images/icon.png"' in page_html
+    assert not (build / "html/_static/datatables-data").exists()
+
+
+def test_downloads_extracted(tmp_path: Path, basic_site: Path) -> None:
+    """Test download links in extracted rows are relative to their page."""
+    build = tmp_path / "build"
+    (basic_site / "sub").mkdir()
+    (basic_site / "sub/notes.txt").write_text("notes", encoding="utf-8")
+    rows = [("alpha", ":download:`notes.txt`"), ("beta", "x"), ("gamma", "y")]
+    write_list_table(basic_site / "sub/page.rst", rows)
+    append_conf(basic_site, "datatables_external_data_threshold = 1")
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    (data_file,) = (build / "html/_static/datatables-data").glob("*.json")
+    data = json.loads(data_file.read_text(encoding="utf-8"))
+    href = data[0][1].split('href="')[1].split('"')[0]
+    assert href.startswith("../_downloads/")
+    assert (build / "html/sub" / href).is_file()
+
+
+def test_sharded_data(tmp_path: Path, basic_site: Path) -> None:
+    """Test large tables are written as pre-sorted shards, served statically."""
+    build = tmp_path / "build"
+    rows = [("e", "10"), ("b", "9"), ("d", "100"), ("a", "1,000"), ("c", "-1")]
+    write_list_table(basic_site / "page.rst", rows)
+    append_conf(
+        basic_site,
+        "datatables_external_data_threshold = 1",
+        "datatables_shard_size = 2",
+        "datatables_column_types = True",
+        "datatables_large_cells = 1",
+        "datatables_large_options = {'autoWidth': False}",
+    )
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    html = build / "html"
+    page_html = (html / "page.html").read_text(encoding="utf-8")
+    assert "sphinxDatatables.shardedAjax(" in page_html
+    # the large table's options and column types are kept with the shards
+    assert 'Object.assign({"autoWidth": false, "columnDefs": [' in page_html
+    (data_dir,) = (html / "_static/datatables-data").iterdir()
+
+    def get(url: str) -> list | dict:
+        with urllib.request.urlopen(url) as response:  # noqa: S310
+            return json.load(response)
+
+    with serve(html) as root:
+        base = f"{root}/_static/datatables-data/{data_dir.name}"
+        manifest = get(f"{base}/manifest.json")
+        assert manifest == {"rows": 5, "shardSize": 2, "orders": ["n", "0", "1"]}
+        by_name = [row for shard in range(3) for row in get(f"{base}/0/{shard}.json")]
+        assert [name for name, _ in by_name] == ["a", "b", "c", "d", "e"]
+        by_value = [row for shard in range(3) for row in get(f"{base}/1/{shard}.json")]
+        assert [value for _, value in by_value] == ["-1", "9", "10", "100", "1,000"]
+
+        if shutil.which("node") is None:  # pragma: no cover
+            return
+
+        (activate_js,) = (html / "_static").glob("activate_datatables.*.js")
+        stubs = textwrap.dedent("""
+            globalThis.window = globalThis;
+            globalThis.document = { addEventListener() {} };
+        """)
+        request = {
+            "draw": 3,
+            "start": 1,
+            "length": 3,
+            "order": [{"column": 1, "dir": "desc"}],
+        }
+        script = textwrap.dedent(f"""
+            const ajax = sphinxDatatables.shardedAjax({json.dumps(base)}, 1);
+            ajax({json.dumps(request)}, (data) => console.log(JSON.stringify(data)));
+        """)
+        script = NL.join([stubs, activate_js.read_text(encoding="utf-8"), script])
+        result = subprocess.run(  # noqa: S603
+            ["node", "-e", script],  # noqa: S607
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        assert json.loads(result.stdout) == {
+            "draw": 3,
+            "recordsTotal": 5,
+            "recordsFiltered": 5,
+            "data": [["d", "100"], ["e", "10"], ["b", "9"]],
+        }
+
+
+CACHE_STUBS = textwrap.dedent("""
+    globalThis.window = globalThis;
+    globalThis.document = { addEventListener() {} };
+    globalThis.location = { pathname: "/page.html" };
+    const fetches = [];
+    globalThis.fetch = async (url) => {
+        fetches.push(url);
+        return { ok: true, json: async () => [[`${fetches.length}`]] };
+    };
+    const entries = new Map();
+    function succeed(result) {
+        const request = { result: result };
+        setTimeout(() => request.onsuccess());
+        return request;
+    }
+    const store = {
+        get: (key) => succeed(entries.get(key)),
+        put: (value, key) => succeed(entries.set(key, value) && key),
+    };
+    const db = {
+        createObjectStore() {},
+        transaction: () => ({ objectStore: () => store }),
+    };
+    globalThis.indexedDB = { open: () => succeed(db) };
+""")
+
+
+@pytest.mark.parametrize("minify", [False, True])
+def test_cached_data(tmp_path: Path, basic_site: Path, minify: bool) -> None:
+    """Test extracted rows are loaded through IndexedDB, keyed by their hash."""
+    build = tmp_path / "build"
+    write_list_table(basic_site / "page.rst", [("alpha", "1"), ("beta", "2")])
+    append_conf(
+        basic_site,
+        "datatables_external_data_threshold = 1",
+        "datatables_large_cells = 1",
+        "datatables_large_options = {'autoWidth': False}",
+        "datatables_cache_data = True",
+        f"datatables_minify = {minify}",
+    )
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    html = build / "html"
+    page_html = (html / "page.html").read_text(encoding="utf-8")
+    (data_file,) = (html / "_static/datatables-data").glob("data.*.json")
+    digest = data_file.name.split(".")[1]
+    url = f"_static/datatables-data/{data_file.name}"
+    assert f'sphinxDatatables.cachedAjax("{url}", "{digest}", false)' in page_html
+    # the options of large tables are kept
+    (options,) = (line for line in page_html.splitlines() if "Object.assign" in line)
+    if minify:
+        assert options.startswith('Object.assign({"autoWidth":false}, {deferRender')
+        assert options.endswith("false),}),")
+    else:
+        assert options.strip() == 'Object.assign({"autoWidth": false}, {'
+
+    if shutil.which("node") is None:  # pragma: no cover
+        return
+
+    (activate_js,) = (html / "_static").glob("activate_datatables.*.js")
+    script = textwrap.dedent("""
+        const settings = { nTable: { id: "table-0" } };
+        const load = (hash) => new Promise((resolve) => {
+            const ajax = sphinxDatatables.cachedAjax("data.json", hash, false);
+            setTimeout(() => ajax({}, resolve, settings), 10);
+        });
+        (async () => {
+            const results = [await load("a"), await load("a"), await load("b")];
+            console.log(JSON.stringify({ fetches: fetches.length, results }));
+        })();
+    """)
+    script = NL.join([CACHE_STUBS, activate_js.read_text(encoding="utf-8"), script])
+    result = subprocess.run(  # noqa: S603
+        ["node", "-e", script],  # noqa: S607
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    # only fetched again once the hash changes, replacing the stale entry
+    assert json.loads(result.stdout) == {
+        "fetches": 2,
+        "results": [{"data": [["1"]]}, {"data": [["1"]]}, {"data": [["2"]]}],
+    }
+
+
+@pytest.mark.parametrize("global_types", [False, True])
+@pytest.mark.parametrize("directive_types", [None, "on", "off"])
+def test_column_types(
+    tmp_path: Path,
+    basic_site: Path,
+    global_types: bool,
+    directive_types: str | None,
+) -> None:
+    """Test column types are detected at build time and emitted as columnDefs."""
+    build = tmp_path / "build"
+    rows = [("1.5", "2024-01-31"), ("-2", "2023-12-01"), ("", "2022-06-15")]
+    write_list_table(basic_site / "page.rst", rows)
+    page_rst = basic_site / "page.rst"
+    page_rst.write_text(
+        page_rst.read_text(encoding="utf-8").replace(
+            ":class: sphinx-datatable", ":class: custom-datatable"
+        )
+        + textwrap.dedent(f"""
+
+            .. datatables-json:: table.custom-datatable
+                {f":column-types: {directive_types}" if directive_types else ""}
+
+                {{"paging": false, "columnDefs": [{{"targets": 1, "type": "string"}}]}}
+        """),
+        encoding="utf-8",
+    )
+    append_conf(basic_site, f"datatables_column_types = {global_types}")
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    index_html = (build / "html/index.html").read_text(encoding="utf-8")
+    page_html = (build / "html/page.html").read_text(encoding="utf-8")
+    enabled = directive_types == "on" or (global_types and directive_types != "off")
+    # user options are kept first, so they take priority in DataTables
+    assert ('"type": "num"' in page_html) is enabled
+    if enabled:
+        assert page_html.index('"type": "string"') < page_html.index('"type": "num"')
+    assert ('"type": "date"' in page_html) is enabled
+    # the default table is given its own options when types are enabled globally
+    assert ('"type": "string"' in index_html) is global_types
+    table_tag = index_html.split("<table")[1].split(">")[0]
+    assert "sphinx-datatable" in table_tag
+    assert ("sphinx-datatables-own-options" in table_tag) is global_types
+
+
+@pytest.mark.parametrize(
+    ("values", "expected"),
+    [
+        (["1.5", "-2", ""], "num"),
+        (["1,000", "2.5"], "num-fmt"),
+        (["NaN", "inf"], "string"),
+        (["Infinity", "1"], "string"),
+        (["1_000", "2"], "string"),
+    ],
+)
+def test_column_type(values: list[str], expected: str) -> None:
+    """Test only plain and comma-separated numbers are detected as numeric."""
+    entries = [nodes.entry("", nodes.paragraph(text=value)) for value in values]
+    assert column_type(entries) == expected
+
+
+@pytest.mark.parametrize(
+    ("values", "expected"),
+    [
+        (["3", "", "1,000", "2"], [1, 3, 0, 2]),
+        (["3", "nan", "1", "2"], [2, 3, 0, 1]),
+        (["b", "", "A", "10"], [1, 3, 2, 0]),
+    ],
+)
+def test_column_order(values: list[str], expected: list[int]) -> None:
+    """Test shards are ordered numerically only when every value is a number."""
+    assert column_order(values) == expected
+
+
+def test_shared_column_types(tmp_path: Path, basic_site: Path) -> None:
+    """Test a directive's tables only share the column types they agree on."""
+    build = tmp_path / "build"
+
+    def table(*cells: str) -> str:
+        rows = [("A", "B", "C"), cells, cells]
+        return NL.join(
+            [
+                ".. list-table::",
+                "    :header-rows: 1",
+                "    :class: custom",
+                "",
+                *(f"    * - {a}{NL}      - {b}{NL}      - {c}" for a, b, c in rows),
+                "",
+            ]
+        )
+
+    (basic_site / "page.rst").write_text(
+        NL.join(
+            [
+                ":orphan:",
+                "",
+                "page",
+                "====",
+                "",
+                table("1", "text", "2024-01-31"),
+                table("text", "2", "2023-12-01"),
+                ".. datatables-json:: table.custom",
+                "    :column-types: on",
+                "",
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    page_html = (build / "html/page.html").read_text(encoding="utf-8")
+    compact = "".join(page_html.split())
+    assert '"columnDefs":[{"targets":2,"type":"date"}]' in compact
+
+
+@pytest.mark.parametrize(
+    ("key", "values"),
+    [
+        ("number", ["-3", "2", "1,000.5", "2e4"]),
+        ("size", ["12 B", "1 KB", "1000 KiB", "1.2 GiB", "2 TB"]),
+        ("version", ["1.2", "1.10.0", "2.0.0", "2.0.1", "10.0"]),
+        ("date", ["Jan 5, 1999", "2000-02-01", "03/01/2000", "1 April 2000"]),
+        ("text", ["  alpha", "BETA", "gamma  delta"]),
+    ],
+)
+def test_key_functions(key: str, values: list[str]) -> None:
+    """Test the built-in key functions order values as expected."""
+    keys = [KEY_FUNCTIONS[key](value) for value in values]
+    if key in ("number", "size"):
+        assert keys == sorted(keys, key=float)
+    else:
+        assert keys == sorted(keys)
+
+
+def test_cell_keys(
+    tmp_path: Path, basic_site: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test sort and search keys are added to cells as data attributes."""
+    build = tmp_path / "build"
+    rows = [("**big**", "1.5 GiB"), ("small", "12 KB")]
+    write_list_table(basic_site / "page.rst", rows)
+    (tmp_path / "cell_keys.py").write_text(
+        "def upper(text):\n    return text.upper()\n", encoding="utf-8"
+    )
+    monkeypatch.syspath_prepend(tmp_path)
+    append_conf(
+        basic_site,
+        "datatables_sort_keys = {'Value': 'size'}",
+        "datatables_search_keys = {0: 'cell_keys:upper'}",
+    )
+
+    warnings = StringIO()
+    app = SphinxTestApp(
+        "html",
+        SphinxTestPath(basic_site),
+        SphinxTestPath(build),
+        warning=warnings,
+    )
+    app.build()
+    assert app.statuscode == 0
+    # keys given by path can be cached with the rest of the configuration
+    assert "cannot cache" not in warnings.getvalue()
+
+    page_html = (build / "html/page.html").read_text(encoding="utf-8")
+    assert '<td data-search="BIG"><p><strong>big</strong></p></td>' in page_html
+    assert '<td data-order="1610612736.0"><p>1.5 GiB</p></td>' in page_html
+    assert '<td data-order="12000.0"><p>12 KB</p></td>' in page_html
+    # header cells are left as they are
+    assert '<th class="head"><p>Value</p></th>' in page_html
+
+
+def test_cell_key_columns(tmp_path: Path, basic_site: Path) -> None:
+    """Test keys for missing columns are skipped, and set the column types."""
+    build = tmp_path / "build"
+    write_list_table(basic_site / "page.rst", [("a", "2 KB"), ("b", "10 KB")])
+    append_conf(
+        basic_site,
+        "datatables_column_types = True",
+        "datatables_sort_keys = {2: 'number', -1: 'size', -3: 'number'}",
+        "datatables_search_keys = {-2: lambda text: text.upper()}",
+    )
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    page_html = (build / "html/page.html").read_text(encoding="utf-8")
+    assert '<td data-search="A"><p>a</p></td>' in page_html
+    assert '<td data-order="2000.0"><p>2 KB</p></td>' in page_html
+    # sorted by the keys, as numbers, rather than by the text as shown
+    compact = "".join(page_html.split())
+    assert '{"targets":1,"type":"num"}' in compact
+    assert '{"targets":0,"type":"string"}' in compact
+
+
+@pytest.mark.parametrize("rows", [2, 3, 5])
+def test_size_policy(tmp_path: Path, basic_site: Path, rows: int) -> None:
+    """Test small tables are left alone, and large tables get their own options."""
+    build = tmp_path / "build"
+    write_list_table(basic_site / "page.rst", [(f"{row}", "x") for row in range(rows)])
+    append_conf(
+        basic_site,
+        f"datatables_min_rows = {MIN_ROWS}",
+        f"datatables_large_cells = {LARGE_CELLS}",
+    )
+
+    app = SphinxTestApp("html", SphinxTestPath(basic_site), SphinxTestPath(build))
+    app.build()
+    assert app.statuscode == 0
+
+    page_html = (build / "html/page.html").read_text(encoding="utf-8")
+    table_tag = page_html.split("<table")[1].split(">")[0]
+    # small tables don't load DataTables at all
+    is_initialized = rows >= MIN_ROWS
+    is_large = rows * 2 > LARGE_CELLS
+    assert ("activate_datatables." in page_html) is is_initialized
+    assert ('"autoWidth": false' in page_html) is is_large
+    assert ("sphinx-datatable" in table_tag) is is_initialized
+    assert ("sphinx-datatables-own-options" in table_tag) is is_large